@@ -0,0 +1,14 @@
+from django.conf import settings
+
+from posts.notifications import unread_count
+
+
+def unread(request):
+    """Добавляет счётчик непрочитанных уведомлений."""
+    if not request.user.is_authenticated:
+        return {}
+    count = unread_count(request.user)
+    limit = settings.NOTIFICATIONS_UNREAD_LIMIT
+    return {
+        'unread_notifications': f'{limit}+' if count > limit else count
+    }
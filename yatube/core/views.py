@@ -1,10 +1,29 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponseNotFound
 from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.html import escape
+
+# Вместо адреса в заранее отрендеренную страницу 404 подставляется
+# путь конкретного запроса
+PATH_PLACEHOLDER = '\0path\0'
 
 
 def page_not_found(request, exception):
     # Переменная exception содержит отладочную информацию;
     # выводить её в шаблон пользовательской страницы 404 мы не станем
-    return render(request, 'core/404.html', {'path': request.path}, status=404)
+    if request.user.is_authenticated:
+        return render(
+            request, 'core/404.html', {'path': request.path}, status=404)
+    # Анонимам, в том числе сканерам, отдаём страницу из кэша
+    body = cache.get('core:404')
+    if body is None:
+        body = render_to_string(
+            'core/404.html', {'path': PATH_PLACEHOLDER}, request)
+        cache.set('core:404', body, settings.NOT_FOUND_PAGE_TIMEOUT)
+    return HttpResponseNotFound(
+        body.replace(PATH_PLACEHOLDER, escape(request.path)))
 
 
 def csrf_failure(request, reason=''):
@@ -1,11 +1,66 @@
+from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.helpers import ACTION_CHECKBOX_NAME
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.contrib.auth import get_permission_codename
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
 
-from .models import Post
+from .bulk import start_job
+from .deletion import post_dependents, schedule_posts_deletion
+from .models import BulkJob, Comment, DeletionTask, Follow, Post, User
 from .models import Group
+from .paginators import EstimatedPaginator
+
+
+def deletion_perms_needed(request, admin_site, querysets):
+    """Модели, строки которых удаление затронет без права на это.
+
+    Как и в стандартном get_deleted_objects, проверяются только модели,
+    зарегистрированные в админке; по каждой - один запрос exists().
+    """
+    perms_needed = set()
+    for queryset in querysets:
+        opts = queryset.model._meta
+        if queryset.model not in admin_site._registry:
+            continue
+        codename = get_permission_codename('delete', opts)
+        if request.user.has_perm(f'{opts.app_label}.{codename}'):
+            continue
+        if queryset.exists():
+            perms_needed.add(opts.verbose_name)
+    return perms_needed
+
+
+class ScalableAdmin(admin.ModelAdmin):
+    """Общие настройки списков для больших таблиц."""
+    paginator = EstimatedPaginator
+    # Не считать всю таблицу ради «N из M» при поиске и фильтрах
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+class BulkGroupForm(forms.Form):
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        required=False,
+        label='Группа',
+        help_text='Пустое значение уберёт посты из групп',
+    )
+
+
+class BulkAuthorForm(forms.Form):
+    author = forms.ModelChoiceField(
+        User.objects.all(),
+        label='Автор',
+        widget=AutocompleteSelect(
+            Post._meta.get_field('author').remote_field, admin.site),
+    )
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(ScalableAdmin):
     list_display = (
         'pk',
         'text',
@@ -13,10 +68,177 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'group',
     )
-    list_editable = ('group',)
+    # Без list_editable: редактируемая группа стоила бы <select>
+    # и запрос на каждую строку списка
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
-    empty_value_display = '-пусто-'
+    date_hierarchy = 'pub_date'
+
+    actions = (
+        'move_to_group',
+        'reassign_author',
+        'delete_in_batches',
+        'purge_images',
+    )
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(pending_delete=False)
+
+    def get_actions(self, request):
+        # Стандартное удаление грузит все объекты в память
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    def move_to_group(self, request, queryset):
+        return self._bulk_action(
+            request, queryset, BulkJob.MOVE_TO_GROUP, BulkGroupForm)
+    move_to_group.short_description = 'Перенести в группу'
+
+    def reassign_author(self, request, queryset):
+        return self._bulk_action(
+            request, queryset, BulkJob.REASSIGN_AUTHOR, BulkAuthorForm)
+    reassign_author.short_description = 'Сменить автора'
+
+    def delete_in_batches(self, request, queryset):
+        return self._bulk_action(request, queryset, BulkJob.DELETE)
+    delete_in_batches.short_description = 'Удалить выбранные посты'
+
+    def purge_images(self, request, queryset):
+        return self._bulk_action(request, queryset, BulkJob.PURGE_IMAGES)
+    purge_images.short_description = 'Удалить картинки'
+
+    def _bulk_action(self, request, queryset, action, form_class=None):
+        """Подтверждение действия и запуск BulkJob."""
+        form = None
+        if form_class is not None:
+            form = form_class(request.POST if 'apply' in request.POST
+                              else None)
+        if 'apply' in request.POST and (form is None or form.is_valid()):
+            params = form.cleaned_data if form is not None else {}
+            job = start_job(action, queryset, request.user,
+                            settings.ADMIN_BATCH_SIZE, **params)
+            self.message_user(request, f'{job}: обработано {job.processed} '
+                                       f'из {job.total} постов')
+            return redirect('admin:posts_bulkjob_change', job.pk)
+        media = self.media
+        if form is not None:
+            media += form.media
+        context = {
+            **self.admin_site.each_context(request),
+            'title': dict(BulkJob.ACTION_CHOICES)[action],
+            'opts': self.model._meta,
+            'form': form,
+            'media': media,
+            'count': queryset.count(),
+            'action': request.POST['action'],
+            'select_across': request.POST.get('select_across', '0'),
+            'selected': request.POST.getlist(ACTION_CHECKBOX_NAME),
+            'action_checkbox_name': ACTION_CHECKBOX_NAME,
+        }
+        return TemplateResponse(
+            request, 'admin/posts/post/bulk_action.html', context)
+
+    # Удаление только помечает посты, строки удаляет process_deletions
+    def get_deleted_objects(self, objs, request):
+        perms_needed = deletion_perms_needed(
+            request, self.admin_site,
+            post_dependents([obj.pk for obj in objs]))
+        return [str(obj) for obj in objs], {}, perms_needed, []
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, Post.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        schedule_posts_deletion(queryset, settings.ADMIN_BATCH_SIZE)
+
+
+@admin.register(Comment)
+class CommentAdmin(ScalableAdmin):
+    list_display = (
+        'pk',
+        'text',
+        'created',
+        'author',
+        'post',
+    )
+    list_select_related = ('author', 'post')
+    autocomplete_fields = ('author', 'post')
+    search_fields = ('text',)
+    date_hierarchy = 'created'
+
+
+@admin.register(Follow)
+class FollowAdmin(ScalableAdmin):
+    list_display = (
+        'pk',
+        'user',
+        'author',
+    )
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+
+
+@admin.register(Group)
+class GroupAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'title',
+        'slug',
+    )
+    search_fields = ('title', 'slug')
+    prepopulated_fields = {'slug': ('title',)}
+
+
+@admin.register(DeletionTask)
+class DeletionTaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'username',
+        'status',
+        'deleted_rows',
+        'created',
+        'finished',
+    )
+    list_filter = ('status',)
+    readonly_fields = list_display
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(BulkJob)
+class BulkJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'action',
+        'progress',
+        'status',
+        'created_by',
+        'created',
+        'finished',
+    )
+    list_filter = ('action', 'status')
+    list_select_related = ('created_by',)
+    fields = (
+        'action',
+        'group',
+        'author',
+        'progress',
+        'status',
+        'created_by',
+        'created',
+        'finished',
+    )
+    readonly_fields = fields
+    # Страница задания обновляется сама, пока оно выполняется
+    change_form_template = 'admin/posts/bulkjob/change_form.html'
 
+    def progress(self, obj):
+        return f'{obj.processed} / {obj.total}'
+    progress.short_description = 'Прогресс'
 
-admin.site.register(Group)
+    def has_add_permission(self, request):
+        return False
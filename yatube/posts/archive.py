@@ -0,0 +1,116 @@
+"""Архив старых постов.
+
+Посты старше порога переносятся в отдельные таблицы ArchivedPost
+и ArchivedComment, чтобы горячая таблица posts_post и её индексы
+содержали только свежие записи. Страница поста и профиль читают архив
+прозрачно.
+"""
+from django.db import transaction
+from django.db.models import Sum
+
+from . import media, object_cache
+from .deletion import POST_DEPENDENTS
+from .models import ArchivedComment, ArchivedPost, Comment, LikeCounter, Post
+
+
+def archive_batch(cutoff, batch_size):
+    """Переносит в архив до batch_size постов старше cutoff."""
+    with transaction.atomic():
+        posts = list(
+            Post.objects.filter(pub_date__lt=cutoff, pending_delete=False)
+            .order_by('pub_date', 'id')[:batch_size]
+        )
+        if not posts:
+            return 0
+        ids = [post.id for post in posts]
+        likes = dict(
+            LikeCounter.objects.filter(post_id__in=ids)
+            .values('post').annotate(total=Sum('count'))
+            .values_list('post', 'total')
+        )
+        ArchivedPost.objects.bulk_create(
+            ArchivedPost(
+                id=post.id,
+                text=post.text,
+                text_html=post.text_html,
+                excerpt_html=post.excerpt_html,
+                is_truncated=post.is_truncated,
+                pub_date=post.pub_date,
+                author_id=post.author_id,
+                group_id=post.group_id,
+                image=post.image.name,
+                views=post.views,
+                like_count=likes.get(post.id, 0),
+            )
+            for post in posts
+        )
+        ArchivedComment.objects.bulk_create(
+            ArchivedComment(
+                id=comment.id,
+                post_id=comment.post_id,
+                author_id=comment.author_id,
+                text=comment.text,
+                text_html=comment.text_html,
+                created=comment.created,
+            )
+            for comment in Comment.objects.filter(post_id__in=ids).iterator()
+        )
+        # Удаление постов снимет их ссылки на картинки, а архивные
+        # посты ссылаются на те же файлы
+        media.acquire(post.image.name for post in posts)
+        for model, field in POST_DEPENDENTS:
+            model.objects.filter(**{f'{field}_id__in': ids}).delete()
+        Post.objects.filter(pk__in=ids).delete()
+        # bulk_create не шлёт сигналов, а страница поста могла уже
+        # запомнить эти id как отсутствующие в архиве
+        transaction.on_commit(
+            lambda: object_cache.invalidate(ArchivedPost, ids))
+    return len(posts)
+
+
+def get_archived_post(post_id):
+    """Архивный пост активного автора или None."""
+    post = object_cache.get(ArchivedPost, post_id)
+    if post is None:
+        return None
+    object_cache.attach_related([post])
+    return post if post.author.is_active else None
+
+
+class ChainedPosts:
+    """Последовательность для Paginator: сначала посты, затем архив.
+
+    Срезы за границей первого запроса дочитываются из следующего,
+    так что страницы на стыке собираются из обоих источников.
+    """
+
+    def __init__(self, *querysets):
+        self.querysets = querysets
+        self._counts = None
+
+    def count(self):
+        return sum(self._get_counts())
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start, stop = key.start or 0, key.stop
+        result = []
+        for queryset, count in zip(self.querysets, self._get_counts()):
+            if stop is not None and stop <= 0:
+                break
+            if start < count:
+                end = count if stop is None else min(stop, count)
+                result.extend(queryset[start:end])
+            start = max(start - count, 0)
+            if stop is not None:
+                stop -= count
+        return result
+
+    def _get_counts(self):
+        if self._counts is None:
+            self._counts = [queryset.count() for queryset in self.querysets]
+        return self._counts
@@ -0,0 +1,86 @@
+"""Блокировки и скрытие авторов.
+
+Для каждого зрителя в кэше лежит отсортированный кортеж id авторов,
+которых он скрыл или заблокировал. Ленты исключают их в SQL: короткий
+список - условием NOT IN, длинный - подзапросом NOT EXISTS по Block.
+
+Кэш у каждого процесса свой, поэтому ключ списка включает версию
+из базы - число блокировок зрителя и наибольший id среди них. Её
+читает один запрос по индексу, и скрытие автора в одном процессе
+сразу меняет ключ во всех остальных.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, Max, OuterRef, Q
+
+from .models import Block, Follow
+
+
+def _key(user_id, count, last_id):
+    return f'blocks:excluded:{user_id}:{count}:{last_id}'
+
+
+def excluded_authors(user):
+    """Кортеж id авторов, скрытых зрителем."""
+    if not user.is_authenticated:
+        return ()
+    blocks = Block.objects.filter(user=user)
+    version = blocks.aggregate(count=Count('pk'), last_id=Max('pk'))
+    if not version['count']:
+        return ()
+    key = _key(user.pk, **version)
+    excluded = cache.get(key)
+    if excluded is None:
+        excluded = tuple(blocks.order_by(
+            'target_id').values_list('target_id', flat=True))
+        cache.set(key, excluded, settings.BLOCKS_CACHE_TIMEOUT)
+    return excluded
+
+
+def exclude_authors(queryset, user, field='author'):
+    """Убирает из выборки строки авторов, скрытых зрителем.
+
+    field - путь от модели выборки к автору, например 'post__author'.
+    """
+    excluded = excluded_authors(user)
+    if not excluded:
+        return queryset
+    if len(excluded) <= settings.BLOCKS_INLINE_LIMIT:
+        return queryset.exclude(**{f'{field}__in': excluded})
+    blocked = Block.objects.filter(user=user, target=OuterRef(field))
+    return queryset.annotate(blocked=Exists(blocked)).filter(blocked=False)
+
+
+def feed_suffix(user):
+    """Часть ключа ленты, различающая зрителей с разными списками.
+
+    Зрители без скрытых авторов делят одни и те же страницы кэша.
+    """
+    excluded = excluded_authors(user)
+    if not excluded:
+        return ''
+    digest = hashlib.md5(','.join(map(str, excluded)).encode()).hexdigest()
+    return f':x{digest}'
+
+
+def is_blocked(user, target):
+    """Заблокировал ли user пользователя target."""
+    return Block.objects.filter(
+        user=user, target=target, kind=Block.BLOCK).exists()
+
+
+def set_block(user, target, kind):
+    with transaction.atomic():
+        Block.objects.update_or_create(
+            user=user, target=target, defaults={'kind': kind})
+        if kind == Block.BLOCK:
+            Follow.objects.filter(
+                Q(user=user, author=target) | Q(user=target, author=user)
+            ).delete()
+
+
+def remove_block(user, target):
+    Block.objects.filter(user=user, target=target).delete()
@@ -0,0 +1,154 @@
+"""Живые обновления лент: один опрос базы на процесс и pub/sub.
+
+Посты и комментарии, сохранённые любым процессом, находит опрос базы
+по водяному знаку id. Опрос один на процесс, сколько бы потоков SSE
+ни было открыто: его выполняет тот ждущий поток, который первым
+заметил, что прошло SSE_POLL_INTERVAL секунд, а найденные записи
+раздаются подписчикам каналов. Без подписчиков база не опрашивается.
+
+Подписка - список новых записей и threading.Event, поэтому
+простаивающее SSE-соединение стоит один ждущий генератор. Чтобы держать
+тысячи соединений, приложение запускают под кооперативным воркером
+(например, gunicorn -k gevent): ожидание Event там не занимает поток ОС.
+"""
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max
+
+from .models import Comment, Post
+
+
+def index_channel():
+    return 'index'
+
+
+def author_channel(author_id):
+    return f'author:{author_id}'
+
+
+def group_channel(group_id):
+    return f'group:{group_id}'
+
+
+def comments_channel(post_id):
+    return f'comments:{post_id}'
+
+
+class Subscription:
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self.pending = []
+        self.event = threading.Event()
+
+    def wait(self, timeout):
+        """Ждёт записей не дольше timeout и возвращает их.
+
+        Запись - пара (ключ, id автора): для поста ключ - (pub_date, id),
+        для комментария - id.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            self.broker.poll_if_due()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if self.event.wait(min(remaining, settings.SSE_POLL_INTERVAL)):
+                break
+        with self.broker.lock:
+            items, self.pending = self.pending, []
+            self.event.clear()
+        return items
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+        self._count = 0
+        self._last_poll = None
+        self._last_post_id = None
+        self._last_comment_id = None
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels)
+        with self._poll_lock:
+            if self._last_post_id is None:
+                # Первый подписчик: всё, что старше, поток догонит сам
+                self._last_post_id = _max_id(Post)
+                self._last_comment_id = _max_id(Comment)
+            with self.lock:
+                for channel in subscription.channels:
+                    self._subscriptions[channel].add(subscription)
+                self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._poll_lock, self.lock:
+            for channel in subscription.channels:
+                self._subscriptions[channel].discard(subscription)
+                if not self._subscriptions[channel]:
+                    del self._subscriptions[channel]
+            self._count -= 1
+            if not self._count:
+                # Опрос остановлен - водяной знак устареет
+                self._last_post_id = self._last_comment_id = None
+
+    def publish(self, channel, item):
+        with self.lock:
+            for subscription in self._subscriptions.get(channel, ()):
+                subscription.pending.append(item)
+                subscription.event.set()
+
+    def poll_if_due(self):
+        """Опрашивает базу, если пора и этого не делает другой поток."""
+        if not self._poll_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.monotonic()
+            if self._last_post_id is None or (
+                    self._last_poll is not None
+                    and now - self._last_poll < settings.SSE_POLL_INTERVAL):
+                return
+            self._last_poll = now
+            self._poll()
+        finally:
+            self._poll_lock.release()
+
+    def _poll(self):
+        batch = settings.POSTS_SINCE_MAX_IDS
+        posts = Post.objects.visible().filter(
+            id__gt=self._last_post_id).order_by('id').values_list(
+            'id', 'pub_date', 'author_id', 'group_id')[:batch]
+        for post_id, pub_date, author_id, group_id in posts:
+            item = ((pub_date, post_id), author_id)
+            self.publish(index_channel(), item)
+            self.publish(author_channel(author_id), item)
+            if group_id:
+                self.publish(group_channel(group_id), item)
+            self._last_post_id = post_id
+        comments = Comment.objects.filter(
+            id__gt=self._last_comment_id).order_by('id').values_list(
+            'id', 'post_id', 'author_id')[:batch]
+        for comment_id, post_id, author_id in comments:
+            self.publish(comments_channel(post_id), (comment_id, author_id))
+            self._last_comment_id = comment_id
+        # Между опросами соединение не держим; внутри транзакции
+        # (в тестах) закрывать его нельзя
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+def _max_id(model):
+    return model.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+
+
+broker = Broker()
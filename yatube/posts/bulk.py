@@ -0,0 +1,95 @@
+"""Массовые действия над постами порциями.
+
+Действие фиксирует список id и выполняется порциями по
+ADMIN_BATCH_SIZE постов: каждая порция - один UPDATE или пометка
+к удалению в короткой транзакции. Первую порцию админка выполняет сразу,
+остальные - команда process_bulk_jobs.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from . import feeds, media, object_cache
+from .models import BulkJob, Follow, GroupFollow, Post
+
+
+def start_job(action, queryset, user, batch_size, **params):
+    ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    job = BulkJob.objects.create(
+        action=action,
+        created_by=user,
+        post_ids=','.join(map(str, ids)),
+        total=len(ids),
+        **params
+    )
+    run_step(job, batch_size)
+    return job
+
+
+def run_step(job, batch_size):
+    """Выполняет очередную порцию, возвращает число обработанных постов."""
+    ids = job.post_ids.split(',') if job.post_ids else []
+    chunk = [int(pk) for pk in ids[job.processed:job.processed + batch_size]]
+    with transaction.atomic():
+        if chunk:
+            OPERATIONS[job.action](job, Post.objects.filter(pk__in=chunk))
+            # UPDATE не шлёт сигналов - сбрасываем кэш объектов вручную
+            object_cache.invalidate(Post, chunk)
+        job.processed += len(chunk)
+        if job.processed >= job.total:
+            job.status = BulkJob.DONE
+            job.finished = timezone.now()
+        # post_ids не меняется - не переписываем его на каждой порции
+        job.save(update_fields=['processed', 'status', 'finished'])
+    return len(chunk)
+
+
+def _move_to_group(job, posts):
+    group_ids = set(posts.exclude(group=None).values_list(
+        'group_id', flat=True).distinct())
+    posts.update(group=job.group)
+    group_ids.add(job.group_id)
+    _invalidate_feeds(group_ids=group_ids - {None})
+
+
+def _reassign_author(job, posts):
+    author_ids = set(posts.values_list('author_id', flat=True).distinct())
+    posts.update(author=job.author)
+    author_ids.add(job.author_id)
+    _invalidate_feeds(author_ids=author_ids)
+
+
+def _invalidate_feeds(group_ids=(), author_ids=()):
+    """Сбрасывает ленты, из которых посты ушли или в которые пришли.
+
+    UPDATE не шлёт сигналов, поэтому ленты групп и подписок
+    на затронутые группы и авторов сбрасываются здесь.
+    """
+    for group_id in group_ids:
+        feeds.invalidate(feeds.group_feed(group_id))
+    user_ids = set(GroupFollow.objects.filter(
+        group_id__in=group_ids).values_list('user_id', flat=True))
+    user_ids.update(Follow.objects.filter(
+        author_id__in=author_ids).values_list('user_id', flat=True))
+    for user_id in user_ids:
+        feeds.invalidate(feeds.follow_feed(user_id))
+
+
+def _delete(job, posts):
+    # Строки удалит process_deletions, здесь посты только скрываются
+    posts.update(pending_delete=True)
+
+
+def _purge_images(job, posts):
+    posts = posts.exclude(image='')
+    names = list(posts.values_list('image', flat=True))
+    posts.update(image='')
+    # Файл удаляется, только если на него больше никто не ссылается
+    media.release(names)
+
+
+OPERATIONS = {
+    BulkJob.MOVE_TO_GROUP: _move_to_group,
+    BulkJob.REASSIGN_AUTHOR: _reassign_author,
+    BulkJob.DELETE: _delete,
+    BulkJob.PURGE_IMAGES: _purge_images,
+}
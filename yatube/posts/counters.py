@@ -0,0 +1,90 @@
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F
+
+from . import object_cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedCounter:
+    """Счётчик с отложенной записью (write-behind).
+
+    Приращения копятся в памяти процесса и сбрасываются в базу одной
+    транзакцией, когда накопилось flush_threshold приращений или прошло
+    flush_interval секунд с прошлого сброса (проверяется при очередном
+    приращении).
+
+    Границы потерь: при завершении или падении воркера теряется не больше
+    flush_threshold приращений и не больше того, что накопилось за
+    flush_interval секунд трафика. Каждый воркер буферизует свои приращения
+    отдельно, поэтому значение в базе отстаёт от реального на сумму
+    буферов всех воркеров.
+    """
+
+    def __init__(self, model, field, flush_interval, flush_threshold):
+        self.model = model
+        self.field = field
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._pending = Counter()
+        self._pending_total = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def increment(self, pk, amount=1):
+        with self._lock:
+            self._pending[pk] += amount
+            self._pending_total += amount
+            due = (
+                self._pending_total >= self.flush_threshold
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def pending(self, pk):
+        """Приращения объекта, ещё не записанные в базу."""
+        with self._lock:
+            return self._pending.get(pk, 0)
+
+    def flush(self):
+        """Записывает накопленные приращения, возвращает число объектов."""
+        with self._lock:
+            batch, self._pending = self._pending, Counter()
+            self._pending_total = 0
+            self._last_flush = time.monotonic()
+        if not batch:
+            return 0
+        # Один UPDATE на каждую величину приращения, а не на каждый объект
+        by_amount = defaultdict(list)
+        for pk, amount in batch.items():
+            by_amount[amount].append(pk)
+        try:
+            with transaction.atomic():
+                for amount, pks in by_amount.items():
+                    self.model.objects.filter(pk__in=pks).update(
+                        **{self.field: F(self.field) + amount})
+        except DatabaseError:
+            # База занята - возвращаем приращения в буфер до следующего раза
+            logger.exception('Не удалось сбросить счётчик %s', self.field)
+            with self._lock:
+                self._pending.update(batch)
+                self._pending_total += sum(batch.values())
+            return 0
+        object_cache.invalidate(self.model, batch)
+        return len(batch)
+
+
+post_views = BufferedCounter(
+    Post,
+    'views',
+    flush_interval=settings.POST_VIEWS_FLUSH_INTERVAL,
+    flush_threshold=settings.POST_VIEWS_FLUSH_THRESHOLD,
+)
@@ -0,0 +1,153 @@
+"""Фоновое удаление пользователей и постов порциями.
+
+Пометка (is_active=False у пользователя, pending_delete у поста) сразу
+прячет данные из лент, а сами строки вместе с зависимыми удаляет
+команда process_deletions небольшими транзакциями, не блокируя SQLite
+надолго.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import object_cache
+from .likes import forget_likes
+from .models import (
+    ArchivedComment, ArchivedPost, Block, Comment, DeletionTask, Follow,
+    GroupFollow, Like, LikeCounter, Mention, Notification, NotificationEvent,
+    Post, PostTag
+)
+
+# Зависимые от поста строки: (модель, поле со ссылкой на пост)
+POST_DEPENDENTS = (
+    (Comment, 'post'),
+    (Like, 'post'),
+    (LikeCounter, 'post'),
+    (NotificationEvent, 'post'),
+    (Notification, 'post'),
+    (PostTag, 'post'),
+    (Mention, 'post'),
+)
+# Зависимые от пользователя строки, кроме его постов и лайков
+USER_DEPENDENTS = (
+    (ArchivedComment, 'post__author'),
+    (ArchivedComment, 'author'),
+    (ArchivedPost, 'author'),
+    (Comment, 'author'),
+    (Follow, 'user'),
+    (Follow, 'author'),
+    (GroupFollow, 'user'),
+    (Block, 'user'),
+    (Block, 'target'),
+    (Mention, 'user'),
+    (NotificationEvent, 'recipient'),
+    (NotificationEvent, 'actor'),
+    (Notification, 'recipient'),
+)
+
+
+def post_dependents(post_ids):
+    """Выборки зависимых строк, которые удалит process_posts."""
+    return [
+        model.objects.filter(**{f'{field}_id__in': post_ids})
+        for model, field in POST_DEPENDENTS
+    ]
+
+
+def user_dependents(users):
+    """Выборки строк, которые удалит process_task для users."""
+    posts = Post.objects.filter(author__in=users)
+    return [
+        posts,
+        Like.objects.filter(user__in=users),
+        *post_dependents(posts.values('pk')),
+        *(model.objects.filter(**{f'{field}__in': users})
+          for model, field in USER_DEPENDENTS),
+    ]
+
+
+def schedule_user_deletion(user):
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=('is_active',))
+        return DeletionTask.objects.create(user=user, username=user.username)
+
+
+def schedule_posts_deletion(queryset, batch_size):
+    """Помечает посты к удалению порциями, возвращает их число."""
+    ids = list(queryset.values_list('pk', flat=True))
+    for start in range(0, len(ids), batch_size):
+        Post.objects.filter(pk__in=ids[start:start + batch_size]).update(
+            pending_delete=True)
+    object_cache.invalidate(Post, ids)
+    return len(ids)
+
+
+def delete_batch(queryset, batch_size):
+    """Удаляет не больше batch_size строк, возвращает их число."""
+    ids = list(queryset.order_by().values_list('pk', flat=True)[:batch_size])
+    if ids:
+        queryset.model.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def process_posts(batch_size, queryset=None):
+    """Один шаг удаления постов, возвращает число удалённых строк.
+
+    По умолчанию удаляются посты, помеченные pending_delete.
+    """
+    if queryset is None:
+        queryset = Post.objects.filter(pending_delete=True)
+    with transaction.atomic():
+        ids = list(queryset.order_by().values_list('pk', flat=True)
+                   [:batch_size])
+        if not ids:
+            return 0
+        for model, field in POST_DEPENDENTS:
+            deleted = delete_batch(
+                model.objects.filter(**{f'{field}_id__in': ids}), batch_size)
+            if deleted:
+                # Зависимых строк много - посты удалим на следующих шагах
+                return deleted
+        Post.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def process_task(task, batch_size):
+    """Один шаг удаления пользователя, возвращает число строк."""
+    user = task.user
+    with transaction.atomic():
+        deleted = 0
+        if user is not None:
+            deleted = _process_user(user, batch_size)
+        if deleted:
+            task.deleted_rows += deleted
+        else:
+            if user is not None:
+                user.delete()
+                task.user = None
+                deleted = 1
+                task.deleted_rows += 1
+            task.status = DeletionTask.DONE
+            task.finished = timezone.now()
+        task.save()
+    return deleted
+
+
+def _process_user(user, batch_size):
+    # Посты пользователя уже скрыты из лент через is_active автора
+    deleted = process_posts(batch_size, Post.objects.filter(author=user))
+    if deleted:
+        return deleted
+    likes = list(Like.objects.filter(user=user).order_by()
+                 .values_list('pk', 'post_id')[:batch_size])
+    if likes:
+        forget_likes(Counter(post_id for _, post_id in likes))
+        Like.objects.filter(pk__in=[pk for pk, _ in likes]).delete()
+        return len(likes)
+    for model, field in USER_DEPENDENTS:
+        deleted = delete_batch(
+            model.objects.filter(**{field: user}), batch_size)
+        if deleted:
+            return deleted
+    return 0
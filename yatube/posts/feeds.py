@@ -0,0 +1,150 @@
+"""Кэш лент в виде списков id постов.
+
+Вместо отрендеренной страницы для каждой пары (лента, номер страницы)
+кэшируется только список id её постов, а для ленты - число записей.
+Посты собираются из кэша объектов, поэтому одна запись занимает
+несколько сотен байт и годится и анониму, и вошедшему пользователю.
+"""
+import heapq
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, PageNotAnInteger
+
+from . import object_cache
+from .paginators import EstimatedPaginator, estimate_count
+
+INDEX_FEED = 'index'
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def follow_feed(user_id):
+    return f'follow:{user_id}'
+
+
+def tag_feed(tag_id):
+    return f'tag:{tag_id}'
+
+
+def _generation_key(feed):
+    return f'feed:{feed}:generation'
+
+
+def get_page(feed, queryset, number, table_estimate=False, id_field='pk',
+             variant=''):
+    """Страница ленты: Page с постами, авторами и группами из кэша.
+
+    Лента показывает только начало текста, поэтому полный текст постов
+    не читается. queryset может быть выборкой не постов, а строк индекса
+    (тогда id_field - поле с id поста) или MergedFeed. variant различает
+    выборки одной ленты для разных зрителей, а сбрасываются они вместе.
+    """
+    prefix = f'feed:{feed}:{cache.get(_generation_key(feed), 0)}{variant}'
+    estimate = cache.get(f'{prefix}:count')
+    paginator = EstimatedPaginator(
+        queryset,
+        settings.NUM_OF_DISPLAYED_POSTS,
+        table_estimate=table_estimate,
+        estimate=estimate,
+    )
+    # С закэшированными числом записей и id страницы выборка не нужна:
+    # срез MergedFeed или queryset выполнил бы запросы зря
+    page = _cached_page(paginator, prefix, number) if estimate else None
+    if page is None:
+        page = paginator.get_page(number)
+        if (paginator.count, paginator.is_estimated) != estimate:
+            # Страница могла уточнить оценку - следующие её не проверяют
+            cache.set(f'{prefix}:count',
+                      (paginator.count, paginator.is_estimated),
+                      settings.FEED_CACHE_TIMEOUT)
+        object_list = page.object_list
+        if hasattr(object_list, 'values_list'):
+            object_list = object_list.values_list(id_field, flat=True)
+        page.object_list = list(object_list)
+        cache.set(f'{prefix}:page:{page.number}', page.object_list,
+                  settings.FEED_CACHE_TIMEOUT)
+    page.object_list = object_cache.get_visible_posts(
+        page.object_list, excerpt=True)
+    return page
+
+
+def _cached_page(paginator, prefix, number):
+    """Страница из закэшированных id без запросов или None."""
+    try:
+        number = paginator.validate_number(number)
+    except PageNotAnInteger:
+        number = 1
+    except EmptyPage:
+        return None
+    ids = cache.get(f'{prefix}:page:{number}')
+    if ids is None:
+        return None
+    return paginator._get_page(ids, number, paginator)
+
+
+class MergedFeed:
+    """Последовательность id постов из нескольких источников для Paginator.
+
+    Каждый источник - выборка постов, например посты авторов из
+    подписок (author__in) или групп из подписок (group__in). Срез
+    [start:stop] берёт из каждого источника первые stop постов по
+    (pub_date, id) и сливает их, пропуская посты, попавшие в несколько
+    источников. Источников столько, сколько видов подписок, а не сколько
+    самих подписок: страница стоит один запрос на источник, но базе
+    может понадобиться отсортировать все посты подписок источника, а не
+    stop строк.
+
+    Чтобы дальние страницы не читали всю историю подписок, лента
+    ограничена первыми limit постами: дальше пагинатор не листает.
+    """
+
+    def __init__(self, *sources, limit=None):
+        self.sources = sources
+        self.limit = limit
+
+    def count(self):
+        union = self.sources[0]
+        for source in self.sources[1:]:
+            union = union | source
+        count = estimate_count(union)[0]
+        if self.limit is not None:
+            count = min(count, self.limit)
+        return count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        start, stop = key.start or 0, key.stop
+        if self.limit is not None:
+            stop = self.limit if stop is None else min(stop, self.limit)
+        streams = [
+            source.order_by('-pub_date', '-pk')
+            .values_list('pub_date', 'pk')[:stop]
+            for source in self.sources
+        ]
+        ids = []
+        previous = None
+        for row in heapq.merge(*streams, reverse=True):
+            # Пост из нескольких источников приходит подряд
+            if row == previous:
+                continue
+            previous = row
+            ids.append(row[1])
+            if stop is not None and len(ids) >= stop:
+                break
+        return ids[start:stop]
+
+
+def invalidate(feed):
+    """Сбрасывает все закэшированные страницы ленты."""
+    key = _generation_key(feed)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
@@ -0,0 +1,54 @@
+"""Списки подписчиков и подписок.
+
+Страницы листаются по ключу Follow.id (keyset): запрос страницы - это
+диапазон индекса по author_id или user_id, и его цена не растёт
+с номером страницы, как у OFFSET.
+"""
+from . import object_cache
+from .models import Follow, User
+
+
+class FollowEntry:
+    def __init__(self, follow_id, user, follows_you):
+        self.follow_id = follow_id
+        self.user = user
+        self.follows_you = follows_you
+
+
+def followers_page(author, viewer, after, limit):
+    """Подписчики author, новые первыми; см. follow_page."""
+    return follow_page(
+        Follow.objects.filter(author=author), 'user_id', viewer, after, limit)
+
+
+def following_page(user, viewer, after, limit):
+    """Авторы, на которых подписан user, новые первыми."""
+    return follow_page(
+        Follow.objects.filter(user=user), 'author_id', viewer, after, limit)
+
+
+def follow_page(follows, user_field, viewer, after, limit):
+    """Страница подписок после курсора after и курсор следующей.
+
+    Пользователи берутся из кэша объектов, а признак «подписан на вас»
+    для всей страницы считается одним запросом.
+    """
+    if after is not None:
+        follows = follows.filter(id__lt=after)
+    rows = list(follows.order_by('-id').values_list('id', user_field)
+                [:limit + 1])
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    rows = rows[:limit]
+    users = object_cache.get_many(User, [user_id for _, user_id in rows])
+    follows_you = set()
+    if viewer.is_authenticated and rows:
+        follows_you = set(Follow.objects.filter(
+            author=viewer, user_id__in=list(users)).values_list(
+                'user_id', flat=True))
+    entries = [
+        FollowEntry(follow_id, users[user_id], user_id in follows_you)
+        for follow_id, user_id in rows
+        # Удаляемые пользователи скрыты, как и их посты
+        if user_id in users and users[user_id].is_active
+    ]
+    return entries, next_cursor
@@ -1,4 +1,8 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+
+from .groups import registry as groups
+from .images import normalize_image
 from .models import Post, Comment
 
 
@@ -8,12 +12,27 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ("text", "group", "image")
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Список групп берём из реестра, а не запросом при каждом рендере
+        field = self.fields['group']
+        field.choices = [('', field.empty_label)] + [
+            (group.pk, str(group)) for group in groups.all()
+        ]
+
     def clean_text(self):
         data = self.cleaned_data['text']
         if not data:
             raise forms.ValidationError('Введите текст')
         return data
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        # При редактировании без новой загрузки здесь уже сохранённый файл
+        if isinstance(image, UploadedFile):
+            image = normalize_image(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
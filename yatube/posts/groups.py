@@ -0,0 +1,69 @@
+"""Реестр групп в памяти процесса.
+
+Групп немного и меняются они редко, поэтому каждый процесс держит их
+все в памяти. Кэш у каждого процесса свой, поэтому актуальность
+проверяется по базе: не чаще раза в GROUPS_CHECK_INTERVAL секунд
+процесс читает подпись таблицы (число групп, наибольший id и время
+последней правки) и, если она изменилась, перечитывает таблицу одним
+запросом. Сигналы сохранения и удаления Group заставляют свой процесс
+проверить подпись сразу.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import Group
+
+
+class GroupRegistry:
+    def __init__(self):
+        self._signature = None
+        self._checked = None
+        self._by_id = {}
+        self._by_slug = {}
+        self._lock = threading.Lock()
+
+    def get(self, pk):
+        """Группа по id или None."""
+        group = self._load()[0].get(pk)
+        if group is None:
+            # На группу уже ссылаются, а процесс её ещё не видел
+            group = self._load(force=True)[0].get(pk)
+        return group
+
+    def get_by_slug(self, slug):
+        """Группа по slug или None."""
+        return self._load()[1].get(slug)
+
+    def all(self):
+        """Все группы в порядке id."""
+        return list(self._load()[0].values())
+
+    def invalidate(self):
+        self._checked = None
+
+    def _load(self, force=False):
+        with self._lock:
+            now = time.monotonic()
+            if (force or self._checked is None
+                    or now - self._checked >= settings.GROUPS_CHECK_INTERVAL):
+                signature = Group.objects.aggregate(
+                    count=Count('pk'), last_pk=Max('pk'),
+                    updated=Max('updated'))
+                self._checked = now
+                if signature != self._signature:
+                    groups = list(Group.objects.order_by('pk'))
+                    self._by_id = {group.pk: group for group in groups}
+                    self._by_slug = {group.slug: group for group in groups}
+                    self._signature = signature
+            return self._by_id, self._by_slug
+
+
+registry = GroupRegistry()
+
+
+def invalidate(sender, **kwargs):
+    """Обработчик post_save/post_delete для Group."""
+    registry.invalidate()
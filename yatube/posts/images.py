@@ -0,0 +1,117 @@
+"""Нормализация загружаемых картинок.
+
+Картинка поста проверяется и пережимается один раз при загрузке:
+отклоняются слишком большие файлы и «бомбы» с огромным числом
+пикселей, поворот из EXIF применяется к самим пикселям, а метаданные
+отбрасываются, длинная сторона уменьшается до IMAGE_MAX_SIDE.
+Результат пишется во временный файл на диске, как и сама загрузка.
+Размер файла обработчик загрузок (posts.uploads) ограничивает ещё
+при чтении запроса, а здесь он проверяется для файлов из других
+источников.
+"""
+import logging
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Режимы, чей профиль ICC годится и для RGB-результата
+RGB_MODES = ('RGB', 'RGBA', 'P')
+
+
+def normalize_image(upload):
+    """Проверяет загруженную картинку и возвращает пережатую копию.
+
+    Если пережатый файл не меньше исходного, а уменьшать и вычищать
+    нечего, возвращается исходный файл.
+    """
+    if upload.size > settings.IMAGE_MAX_UPLOAD_SIZE:
+        raise ValidationError(
+            'Файл больше %s'
+            % filesizeformat(settings.IMAGE_MAX_UPLOAD_SIZE))
+    upload.seek(0)
+    with Image.open(_path_or_file(upload)) as source:
+        result = _normalize(source, upload)
+    if result is None:
+        upload.seek(0)
+        return upload
+    logger.info(
+        'Картинка %s: %s -> %s байт, сэкономлено %s',
+        upload.name, upload.size, result.size, upload.size - result.size)
+    return result
+
+
+def _normalize(source, upload):
+    """Пережатая копия или None, если лучше оставить исходный файл."""
+    # Image.open читает только заголовок, пиксели ещё не распакованы
+    width, height = source.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            f'Картинка слишком велика: {width}×{height} пикселей')
+    if getattr(source, 'is_animated', False):
+        # Анимацию не пережимаем, чтобы не потерять кадры
+        return None
+    has_metadata = 'exif' in source.info
+    max_side = settings.IMAGE_MAX_SIDE
+    resized = max(width, height) > max_side
+    # Профиль описывает цвета исходного режима: после перевода CMYK
+    # или оттенков серого в RGB он был бы неверен
+    icc_profile = None
+    if source.mode in RGB_MODES:
+        icc_profile = source.info.get('icc_profile')
+    # JPEG можно распаковать сразу в уменьшенном масштабе
+    source.draft('RGB', (max_side, max_side))
+    image = ImageOps.exif_transpose(source)
+    if 'transparency' in image.info:
+        # Прозрачный цвет (палитры, RGB или L) сглаживание при
+        # уменьшении размыло бы - переводим его в альфа-канал заранее
+        image = image.convert('RGBA')
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    result = _encode(image, upload, icc_profile)
+    if result.size >= upload.size and not resized and not has_metadata:
+        result.close()
+        return None
+    return result
+
+
+def _path_or_file(upload):
+    if hasattr(upload, 'temporary_file_path'):
+        return upload.temporary_file_path()
+    return upload
+
+
+def _has_transparency(image):
+    if image.mode == 'P':
+        return 'transparency' in image.info
+    if image.mode in ('RGBA', 'LA'):
+        return image.getchannel('A').getextrema()[0] < 255
+    return False
+
+
+def _encode(image, upload, icc_profile):
+    """Кодирует картинку: с прозрачностью в PNG, иначе в JPEG."""
+    if _has_transparency(image):
+        image = image.convert('RGBA')
+        image_format, extension, content_type = 'PNG', '.png', 'image/png'
+        options = {'optimize': True}
+    else:
+        image = image.convert('RGB')
+        image_format, extension, content_type = 'JPEG', '.jpg', 'image/jpeg'
+        options = {
+            'quality': settings.IMAGE_JPEG_QUALITY,
+            'optimize': True,
+            'progressive': True,
+        }
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    name = os.path.splitext(os.path.basename(upload.name))[0] + extension
+    result = TemporaryUploadedFile(name, content_type, 0, None)
+    image.save(result, image_format, **options)
+    result.size = result.tell()
+    result.seek(0)
+    return result
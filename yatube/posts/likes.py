@@ -0,0 +1,66 @@
+import random
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from .models import Like, LikeCounter
+
+
+def toggle_like(user, post):
+    """Ставит или снимает лайк, возвращает True, если лайк поставлен."""
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(user=user, post=post).delete()
+        if deleted:
+            delta = -1
+        else:
+            try:
+                with transaction.atomic():
+                    Like.objects.create(user=user, post=post)
+            except IntegrityError:
+                # Параллельный запрос уже поставил этот лайк
+                return True
+            delta = 1
+        shard = random.randrange(settings.LIKE_COUNTER_SHARDS)
+        LikeCounter.objects.get_or_create(post=post, shard=shard)
+        LikeCounter.objects.filter(post=post, shard=shard).update(
+            count=F('count') + delta)
+    return delta > 0
+
+
+def annotate_likes(posts, user):
+    """Проставляет постам like_count и liked.
+
+    На всю страницу уходит два запроса: суммы по шардам счётчиков
+    и список постов страницы, лайкнутых пользователем.
+    """
+    # У архивных постов лайки хранятся готовым числом
+    live = [post for post in posts if not getattr(post, 'is_archived', False)]
+    ids = [post.id for post in live]
+    counts = dict(
+        LikeCounter.objects.filter(post_id__in=ids)
+        .values('post')
+        .annotate(total=Sum('count'))
+        .values_list('post', 'total')
+    )
+    liked = set()
+    if user.is_authenticated:
+        liked = set(
+            Like.objects.filter(user=user, post_id__in=ids)
+            .values_list('post_id', flat=True)
+        )
+    for post in live:
+        post.like_count = counts.get(post.id, 0)
+        post.liked = post.id in liked
+    return posts
+
+
+def forget_likes(counts):
+    """Вычитает из счётчиков лайки, удаляемые в обход toggle_like.
+
+    counts - словарь {id поста: сколько лайков удаляется}.
+    """
+    for post_id, amount in counts.items():
+        LikeCounter.objects.get_or_create(post_id=post_id, shard=0)
+        LikeCounter.objects.filter(post_id=post_id, shard=0).update(
+            count=F('count') - amount)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = ('Обновляет статистику таблиц (ANALYZE), по которой пагинатор '
+            'оценивает число постов. Запускать по расписанию, например '
+            'раз в час')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        with connections[options['database']].cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.stdout.write('Статистика таблиц обновлена')
@@ -0,0 +1,37 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.archive import archive_batch
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые посты в архив порциями'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+            help='Архивировать посты старше этого числа дней')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Остановиться после переноса этого числа постов')
+        parser.add_argument('--pause', type=float, default=0.1)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        limit = options['limit']
+        total = 0
+        while limit is None or total < limit:
+            batch_size = options['batch_size']
+            if limit is not None:
+                batch_size = min(batch_size, limit - total)
+            moved = archive_batch(cutoff, batch_size)
+            if not moved:
+                break
+            total += moved
+            self.stdout.write(f'Перенесено постов: {total}')
+            time.sleep(options['pause'])
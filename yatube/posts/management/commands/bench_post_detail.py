@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from posts.counters import post_views
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет пропускную способность страницы поста '
+        'с включённым и выключенным счётчиком просмотров'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('post_id', type=int)
+        parser.add_argument('--requests', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        post_id = options['post_id']
+        if not Post.objects.filter(id=post_id).exists():
+            raise CommandError(f'Пост {post_id} не найден')
+        url = reverse('posts:post_detail', kwargs={'post_id': post_id})
+        for enabled in (False, True):
+            with override_settings(POST_VIEWS_ENABLED=enabled):
+                rate = self.measure(url, options['requests'])
+            post_views.flush()
+            label = 'включён' if enabled else 'выключен'
+            self.stdout.write(f'Счётчик {label}: {rate:.1f} запросов/с')
+
+    @staticmethod
+    def measure(url, requests):
+        client = Client()
+        client.get(url)
+        started = time.perf_counter()
+        for _ in range(requests):
+            client.get(url)
+        return requests / (time.perf_counter() - started)
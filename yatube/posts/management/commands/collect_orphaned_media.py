@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from posts.media import delete_unused
+from posts.models import Post
+from posts.orphans import (
+    find_orphans, find_stale_thumbnails, iter_files, older_than,
+    referenced_images
+)
+from posts.storage import storage
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки, на которые не ссылается ни один пост, '
+            'и миниатюры удалённых картинок')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--pause', type=float, default=0.1,
+            help='Пауза после каждой порции удалений в секундах, '
+                 'чтобы не нагружать диск')
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Не трогать файлы моложе стольких секунд')
+
+    def handle(self, *args, **options):
+        self.options = options
+        upload_to = Post._meta.get_field('image').upload_to
+        orphans = find_orphans(
+            older_than(storage, iter_files(storage, upload_to),
+                       options['min_age']),
+            referenced_images(),
+        )
+        self.collect('Картинки', storage, orphans, self.delete_image)
+        thumbnails = iter_files(
+            default.storage, thumbnail_settings.THUMBNAIL_PREFIX)
+        thumbnails = find_stale_thumbnails(
+            older_than(default.storage, thumbnails, options['min_age']),
+            options['batch_size'],
+        )
+        self.collect(
+            'Миниатюры', default.storage, thumbnails, default.storage.delete)
+
+    def collect(self, title, storage, names, delete):
+        count = 0
+        size = 0
+        for name in names:
+            count += 1
+            size += storage.size(name)
+            if self.options['dry_run']:
+                self.stdout.write(name)
+                continue
+            delete(name)
+            if count % self.options['batch_size'] == 0:
+                self.stdout.write(f'{title}: удалено файлов {count}')
+                time.sleep(self.options['pause'])
+        verb = 'к удалению' if self.options['dry_run'] else 'удалено'
+        self.stdout.write(
+            f'{title}: {verb} файлов {count}, {size} байт')
+
+    def delete_image(self, name):
+        # Ссылки посчитаны по постам, но файл может закрепить загрузка
+        delete_unused(name, check_refcount=False)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.notifications import deliver
+
+
+class Command(BaseCommand):
+    help = 'Сводит накопленные события в уведомления пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            delivered = deliver(options['batch_size'])
+            if not delivered:
+                break
+            total += delivered
+        self.stdout.write(f'Разобрано событий: {total}')
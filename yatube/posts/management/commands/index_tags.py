@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+from posts.tags import index_post
+
+
+class Command(BaseCommand):
+    help = ('Перерисовывает HTML постов и заполняет индекс тегов '
+            'и упоминаний для постов, созданных до его появления')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--pause', type=float, default=0.1)
+
+    def handle(self, *args, **options):
+        last_id = 0
+        total = 0
+        while True:
+            posts = list(Post.objects.filter(pk__gt=last_id)
+                         .order_by('pk')[:options['batch_size']])
+            if not posts:
+                break
+            with transaction.atomic():
+                for post in posts:
+                    post.render()
+                    # Упоминания в старых постах уже не новость
+                    index_post(post, notify_mentions=False)
+                Post.objects.bulk_update(posts, Post.RENDERED_FIELDS)
+            last_id = posts[-1].pk
+            total += len(posts)
+            self.stdout.write(f'Обработано постов: {total}')
+            time.sleep(options['pause'])
@@ -0,0 +1,23 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.bulk import run_step
+from posts.models import BulkJob
+
+
+class Command(BaseCommand):
+    help = 'Выполняет массовые действия над постами порциями'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.ADMIN_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0.1)
+
+    def handle(self, *args, **options):
+        for job in BulkJob.objects.filter(status=BulkJob.PENDING):
+            while job.status == BulkJob.PENDING:
+                run_step(job, options['batch_size'])
+                self.stdout.write(f'{job}: {job.processed} / {job.total}')
+                time.sleep(options['pause'])
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.deletion import process_posts, process_task
+from posts.models import DeletionTask, Post
+
+
+class Command(BaseCommand):
+    help = 'Удаляет помеченных пользователей и посты порциями'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--pause', type=float, default=0.1,
+            help='Пауза между порциями в секундах, чтобы не занимать базу')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pending = DeletionTask.objects.filter(status=DeletionTask.PENDING)
+        for task in pending:
+            while task.status == DeletionTask.PENDING:
+                process_task(task, batch_size)
+                self.stdout.write(
+                    f'{task.username}: удалено строк {task.deleted_rows}')
+                time.sleep(options['pause'])
+        total = 0
+        while True:
+            deleted = process_posts(batch_size)
+            if not deleted:
+                break
+            total += deleted
+            remaining = Post.objects.filter(pending_delete=True).count()
+            self.stdout.write(
+                f'Посты: удалено строк {total}, осталось постов {remaining}')
+            time.sleep(options['pause'])
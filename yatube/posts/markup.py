@@ -0,0 +1,99 @@
+"""Разметка текстов постов и комментариев.
+
+HTML считается один раз при сохранении и хранится рядом с исходным
+текстом, поэтому шаблоны выводят его без фильтров.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils.html import escape, format_html, linebreaks
+
+User = get_user_model()
+
+TOKEN_RE = re.compile(
+    r'(?P<url>https?://[^\s<>"]*[^\s<>".,;:!?)\]])'
+    r'|(?<!\w)#(?P<tag>\w+)'
+    r'|(?<![\w@])@(?P<mention>[\w.+-]*\w)'
+)
+
+
+# Длиннее Tag.name теги не индексируются и не становятся ссылками
+MAX_TAG_LENGTH = 100
+
+
+def normalize_tag(name):
+    return name.lower()
+
+
+def hashtags(text):
+    """Нормализованные теги, отмеченные в тексте через #."""
+    return {
+        normalize_tag(match.group('tag')) for match in TOKEN_RE.finditer(text)
+        if match.group('tag') and len(match.group('tag')) <= MAX_TAG_LENGTH
+    }
+
+
+def mentions(text):
+    """Имена пользователей, упомянутых в тексте через @."""
+    return {
+        match.group('mention') for match in TOKEN_RE.finditer(text)
+        if match.group('mention')
+    }
+
+
+def render_text(text):
+    """Безопасный HTML: абзацы, переносы строк, ссылки, #теги и @имена.
+
+    Упоминание становится ссылкой на профиль, только если такой
+    пользователь существует.
+    """
+    names = mentions(text)
+    known = set()
+    if names:
+        known = set(User.objects.filter(username__in=names)
+                    .values_list('username', flat=True))
+    parts = []
+    position = 0
+    for match in TOKEN_RE.finditer(text):
+        parts.append(escape(text[position:match.start()]))
+        parts.append(_render_token(match, known))
+        position = match.end()
+    parts.append(escape(text[position:]))
+    return linebreaks(''.join(parts))
+
+
+def make_excerpt(text, length):
+    """Начало текста не длиннее length символов и признак обрезки.
+
+    Текст режется по границе слова, чтобы не разорвать ссылку или тег.
+    """
+    if len(text) <= length:
+        return text, False
+    cut = text[:length]
+    if not text[length].isspace() and len(cut.split()) > 1:
+        cut = cut.rsplit(maxsplit=1)[0]
+    return cut.rstrip() + '…', True
+
+
+def _render_token(match, known):
+    if match.group('url'):
+        url = match.group('url')
+        return format_html('<a href="{}" rel="nofollow">{}</a>', url, url)
+    tag = match.group('tag')
+    if tag:
+        if len(tag) > MAX_TAG_LENGTH:
+            return escape(match.group(0))
+        return format_html(
+            '<a class="hashtag" href="{}">#{}</a>',
+            reverse('posts:tag_posts', args=[normalize_tag(tag)]),
+            tag,
+        )
+    username = match.group('mention')
+    if username not in known:
+        return escape(match.group(0))
+    return format_html(
+        '<a href="{}">@{}</a>',
+        reverse('posts:profile', args=[username]),
+        username,
+    )
@@ -0,0 +1,145 @@
+"""Счётчики ссылок на файлы картинок.
+
+Одинаковые загрузки хранятся одним файлом (см. posts.storage), поэтому
+удалить файл вместе с постом нельзя - на него могут ссылаться другие.
+Сохранение и удаление постов меняют счётчик в MediaBlob, а файл
+и его миниатюры удаляются после фиксации транзакции, обнулившей
+счётчик.
+
+Та же картинка может загружаться заново, пока файл ждёт удаления.
+Поэтому хранилище, прежде чем отдать готовый файл, закрепляет его
+строку MediaBlob на MEDIA_PIN_TIMEOUT секунд, а удаление под
+блокировкой той же строки перепроверяет, что ссылок и закрепления нет.
+Строка с нулевым счётчиком остаётся, пока файл не удалён.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from sorl.thumbnail import delete as delete_image
+from sorl.thumbnail.images import ImageFile
+
+from .models import MediaBlob
+from .storage import is_content_name, storage
+from .thumbnails import forget_picture
+
+
+def _counts(names):
+    by_count = defaultdict(list)
+    counted = Counter(name for name in names if name and is_content_name(name))
+    for name, count in counted.items():
+        by_count[count].append(name)
+    return by_count
+
+
+def acquire(names):
+    """Добавляет по ссылке на каждое имя из names."""
+    by_count = _counts(names)
+    if not by_count:
+        return
+    MediaBlob.objects.bulk_create(
+        [MediaBlob(name=name) for group in by_count.values()
+         for name in group],
+        ignore_conflicts=True,
+    )
+    for count, group in by_count.items():
+        MediaBlob.objects.filter(name__in=group).update(
+            refcount=F('refcount') + count)
+
+
+def release(names):
+    """Снимает по ссылке с каждого имени и удаляет ненужные файлы.
+
+    Учёт ведётся только для файлов, записанных ContentAddressedStorage.
+    Старые картинки и имена, заданные строкой, не трогаются - их
+    судьбу решает сборщик сирот.
+    """
+    by_count = _counts(names)
+    if not by_count:
+        return
+    all_names = []
+    for count, group in by_count.items():
+        MediaBlob.objects.filter(name__in=group, refcount__gte=count).update(
+            refcount=F('refcount') - count)
+        all_names.extend(group)
+    dead = list(MediaBlob.objects.filter(
+        name__in=all_names, refcount=0).values_list('name', flat=True))
+    if not dead:
+        return
+
+    def delete_files():
+        for name in dead:
+            delete_unused(name)
+    transaction.on_commit(delete_files)
+
+
+def pin(name):
+    """Закрепляет файл за загрузкой, пока её пост не сохранён."""
+    pinned_until = timezone.now() + timedelta(
+        seconds=settings.MEDIA_PIN_TIMEOUT)
+    with transaction.atomic():
+        MediaBlob.objects.get_or_create(name=name)
+        MediaBlob.objects.select_for_update().filter(name=name).update(
+            pinned_until=pinned_until)
+
+
+def delete_unused(name, check_refcount=True):
+    """Удаляет файл, если он не нужен, и возвращает True, если удалил.
+
+    Решение принимается под блокировкой строки MediaBlob, которую
+    берёт и pin, поэтому файл не пропадёт из-под новой загрузки.
+    check_refcount=False - для сборщика сирот, который сам проверил,
+    что на файл не ссылается ни один пост.
+    """
+    with transaction.atomic():
+        blob = MediaBlob.objects.select_for_update().filter(
+            name=name).first()
+        if blob is not None:
+            if check_refcount and blob.refcount:
+                return False
+            if blob.pinned_until and blob.pinned_until > timezone.now():
+                return False
+            blob.delete()
+        delete_file(name)
+    return True
+
+
+def delete_file(name):
+    """Удаляет файл картинки вместе с её миниатюрами."""
+    # sorl-thumbnail ищет миниатюры по имени и хранилищу исходника,
+    # поэтому передаём картинку вместе с хранилищем постов
+    image = ImageFile(name, storage)
+    forget_picture(image)
+    delete_image(image)
+
+
+def track_image(sender, instance, created, update_fields, **kwargs):
+    """Обработчик post_save: переносит ссылку со старой картинки на новую.
+
+    Старое имя запоминает remember_image в pre_save.
+    """
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    old = getattr(instance, '_stored_image', '')
+    new = instance.image.name or ''
+    if old != new:
+        acquire([new])
+        release([old])
+
+
+def remember_image(sender, instance, update_fields, **kwargs):
+    """Обработчик pre_save: имя картинки, записанное в базе."""
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    instance._stored_image = ''
+    if not instance._state.adding:
+        instance._stored_image = sender.objects.filter(
+            pk=instance.pk).values_list('image', flat=True).first() or ''
+
+
+def forget_image(sender, instance, **kwargs):
+    """Обработчик post_delete."""
+    release([instance.image.name])
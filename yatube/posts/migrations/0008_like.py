@@ -0,0 +1,42 @@
+# Generated by Django 2.2.16 on 2026-10-19 05:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0007_post_views'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LikeCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(verbose_name='Шард')),
+                ('count', models.IntegerField(default=0, verbose_name='Лайки')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='like_shards', to='posts.Post', verbose_name='Пост')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Like',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='likes', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='likes', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='likecounter',
+            constraint=models.UniqueConstraint(fields=('post', 'shard'), name='unique_like_shard'),
+        ),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_like'),
+        ),
+    ]
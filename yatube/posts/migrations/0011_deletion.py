@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-19 05:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0010_post_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='pending_delete',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Ожидает удаления'),
+        ),
+        migrations.CreateModel(
+            name='DeletionTask',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(max_length=150, verbose_name='Имя пользователя')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('done', 'Завершено')], default='pending', max_length=20, verbose_name='Статус')),
+                ('deleted_rows', models.PositiveIntegerField(default=0, verbose_name='Удалено строк')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Удаление пользователя',
+                'verbose_name_plural': 'Удаления пользователей',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-19 05:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0013_comment_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('move_to_group', 'Перенос в группу'), ('reassign_author', 'Смена автора'), ('delete', 'Удаление'), ('purge_images', 'Удаление картинок')], max_length=20, verbose_name='Действие')),
+                ('post_ids', models.TextField(editable=False, verbose_name='Посты')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Всего')),
+                ('processed', models.PositiveIntegerField(default=0, verbose_name='Обработано')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('done', 'Завершено')], default='pending', max_length=20, verbose_name='Статус')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Запустил')),
+                ('group', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='posts.Group', verbose_name='Группа')),
+            ],
+            options={
+                'verbose_name': 'Массовое действие',
+                'verbose_name_plural': 'Массовые действия',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 2.2.16 on 2026-10-19 05:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+from ._frozen_markup import render_text
+
+BATCH_SIZE = 1000
+
+
+def render_existing(apps, schema_editor):
+    user_model = apps.get_model(settings.AUTH_USER_MODEL)
+    for name in ('Post', 'Comment', 'ArchivedPost', 'ArchivedComment'):
+        model = apps.get_model('posts', name)
+        batch = []
+        for obj in model.objects.only('id', 'text').iterator():
+            obj.text_html = render_text(obj.text, user_model)
+            batch.append(obj)
+            if len(batch) == BATCH_SIZE:
+                model.objects.bulk_update(batch, ['text_html'])
+                batch = []
+        model.objects.bulk_update(batch, ['text_html'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_bulkjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='text_html',
+            field=models.TextField(blank=True, verbose_name='HTML текста'),
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='text_html',
+            field=models.TextField(blank=True, verbose_name='HTML текста'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='HTML текста'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='HTML текста'),
+        ),
+        migrations.RunPython(render_existing, migrations.RunPython.noop),
+    ]
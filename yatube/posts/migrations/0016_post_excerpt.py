@@ -0,0 +1,57 @@
+# Generated by Django 2.2.16 on 2026-10-19 05:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+from ._frozen_markup import make_excerpt, render_text
+
+BATCH_SIZE = 1000
+
+
+def render_excerpts(apps, schema_editor):
+    user_model = apps.get_model(settings.AUTH_USER_MODEL)
+    for name in ('Post', 'ArchivedPost'):
+        model = apps.get_model('posts', name)
+        batch = []
+        for obj in model.objects.only('id', 'text', 'text_html').iterator():
+            excerpt, obj.is_truncated = make_excerpt(
+                obj.text, settings.POST_EXCERPT_LENGTH)
+            obj.excerpt_html = (
+                render_text(excerpt, user_model) if obj.is_truncated else obj.text_html)
+            batch.append(obj)
+            if len(batch) == BATCH_SIZE:
+                model.objects.bulk_update(
+                    batch, ['excerpt_html', 'is_truncated'])
+                batch = []
+        model.objects.bulk_update(batch, ['excerpt_html', 'is_truncated'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_text_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedpost',
+            name='excerpt_html',
+            field=models.TextField(blank=True, verbose_name='HTML начала текста'),
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='is_truncated',
+            field=models.BooleanField(default=False, verbose_name='Текст длиннее начала'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='excerpt_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='HTML начала текста'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='is_truncated',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Текст длиннее начала'),
+        ),
+        migrations.RunPython(render_excerpts, migrations.RunPython.noop),
+    ]
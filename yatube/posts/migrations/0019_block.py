@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-19 05:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0018_groupfollow'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Block',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('block', 'Блокировка'), ('mute', 'Скрытие')], max_length=10, verbose_name='Тип')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Дата')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blocked_by', to=settings.AUTH_USER_MODEL, verbose_name='Скрытый пользователь')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blocks', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='block',
+            constraint=models.UniqueConstraint(fields=('user', 'target'), name='unique_block'),
+        ),
+    ]
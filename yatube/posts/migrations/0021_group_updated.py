@@ -0,0 +1,20 @@
+# Generated by Django 2.2.16 on 2026-10-19 12:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_media_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-19 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_group_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediablob',
+            name='pinned_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Закреплён до'),
+        ),
+    ]
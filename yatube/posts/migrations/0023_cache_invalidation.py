@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-19 06:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_media_blob_pin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheInvalidation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200, verbose_name='Ключ')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Дата')),
+            ],
+            options={
+                'verbose_name': 'Сброс кэша',
+                'verbose_name_plural': 'Сбросы кэша',
+            },
+        ),
+    ]
@@ -0,0 +1,71 @@
+"""Копия posts.markup на момент миграций 0015 и 0016.
+
+Миграции должны выполняться одинаково и после правок живого кода,
+поэтому они берут разметку отсюда. Пути ссылок записаны как были,
+а пользователи ищутся через историческую модель. Модули с именем
+на «_» загрузчик миграций пропускает. Этот файл не меняется.
+"""
+import re
+from urllib.parse import quote
+
+from django.utils.html import escape, format_html, linebreaks
+
+TOKEN_RE = re.compile(
+    r'(?P<url>https?://[^\s<>"]*[^\s<>".,;:!?)\]])'
+    r'|(?<!\w)#(?P<tag>\w+)'
+    r'|(?<![\w@])@(?P<mention>[\w.+-]*\w)'
+)
+MAX_TAG_LENGTH = 100
+# Как в django.urls: не кодируются sub-delims RFC 3986 и «/~:@»
+SAFE_CHARS = "!$&'()*+,;=/~:@"
+
+
+def render_text(text, user_model):
+    names = {
+        match.group('mention') for match in TOKEN_RE.finditer(text)
+        if match.group('mention')
+    }
+    known = set()
+    if names:
+        known = set(user_model.objects.filter(username__in=names)
+                    .values_list('username', flat=True))
+    parts = []
+    position = 0
+    for match in TOKEN_RE.finditer(text):
+        parts.append(escape(text[position:match.start()]))
+        parts.append(_render_token(match, known))
+        position = match.end()
+    parts.append(escape(text[position:]))
+    return linebreaks(''.join(parts))
+
+
+def make_excerpt(text, length):
+    if len(text) <= length:
+        return text, False
+    cut = text[:length]
+    if not text[length].isspace() and len(cut.split()) > 1:
+        cut = cut.rsplit(maxsplit=1)[0]
+    return cut.rstrip() + '…', True
+
+
+def _render_token(match, known):
+    if match.group('url'):
+        url = match.group('url')
+        return format_html('<a href="{}" rel="nofollow">{}</a>', url, url)
+    tag = match.group('tag')
+    if tag:
+        if len(tag) > MAX_TAG_LENGTH:
+            return escape(match.group(0))
+        return format_html(
+            '<a class="hashtag" href="{}">#{}</a>',
+            '/tags/%s/' % quote(tag.lower(), safe=SAFE_CHARS),
+            tag,
+        )
+    username = match.group('mention')
+    if username not in known:
+        return escape(match.group(0))
+    return format_html(
+        '<a href="{}">@{}</a>',
+        '/profile/%s/' % quote(username, safe=SAFE_CHARS),
+        username,
+    )
@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .markup import make_excerpt, render_text
+from .storage import storage
+
 User = get_user_model()
 
 
@@ -8,16 +12,49 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True, max_length=50)
     description = models.TextField(blank=True, null=True)
+    # По времени изменения процессы замечают правки групп (см. posts.groups)
+    updated = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return self.title
 
 
+def render_on_save(instance, kwargs):
+    """Пересчитывает HTML перед сохранением, если меняется text."""
+    update_fields = kwargs.get('update_fields')
+    if update_fields is None:
+        instance.render()
+    elif 'text' in update_fields:
+        instance.render()
+        kwargs['update_fields'] = {*update_fields, *instance.RENDERED_FIELDS}
+
+
+class PostQuerySet(models.QuerySet):
+    def visible(self):
+        """Посты, не ожидающие удаления, от активных авторов."""
+        return self.filter(pending_delete=False, author__is_active=True)
+
+
 class Post(models.Model):
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст поста'
     )
+    text_html = models.TextField(
+        'HTML текста',
+        blank=True,
+        editable=False
+    )
+    excerpt_html = models.TextField(
+        'HTML начала текста',
+        blank=True,
+        editable=False
+    )
+    is_truncated = models.BooleanField(
+        'Текст длиннее начала',
+        default=False,
+        editable=False
+    )
 
     pub_date = models.DateTimeField(
         'Дата публикации',
@@ -41,17 +78,52 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=storage,
         blank=True
     )
+    views = models.PositiveIntegerField(
+        'Просмотры',
+        default=0,
+        editable=False
+    )
+    pending_delete = models.BooleanField(
+        'Ожидает удаления',
+        default=False,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
-        ordering = ('-pub_date',)
+        # id разрешает равенство дат, чтобы пара (pub_date, id)
+        # однозначно задавала позицию поста в ленте
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(fields=('pub_date', 'id')),
+            models.Index(fields=('author', 'pub_date')),
+            models.Index(fields=('group', 'pub_date')),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
     def __str__(self) -> str:
         return self.text[:15]
 
+    RENDERED_FIELDS = ('text_html', 'excerpt_html', 'is_truncated')
+    # Поля, которые лентам не нужны: там выводится только начало текста
+    FULL_TEXT_FIELDS = ('text', 'text_html')
+
+    def render(self):
+        self.text_html = render_text(self.text)
+        excerpt, self.is_truncated = make_excerpt(
+            self.text, settings.POST_EXCERPT_LENGTH)
+        self.excerpt_html = (
+            render_text(excerpt) if self.is_truncated else self.text_html)
+
+    def save(self, *args, **kwargs):
+        render_on_save(self, kwargs)
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -68,14 +140,29 @@ class Comment(models.Model):
         verbose_name='Текст комментария',
         help_text='Введите текст'
     )
+    text_html = models.TextField(
+        'HTML текста',
+        blank=True,
+        editable=False
+    )
     created = models.DateTimeField(
         'Дата публикации',
-        auto_now_add=True
+        auto_now_add=True,
+        db_index=True
     )
 
     def __str__(self):
         return self.text
 
+    RENDERED_FIELDS = ('text_html',)
+
+    def render(self):
+        self.text_html = render_text(self.text)
+
+    def save(self, *args, **kwargs):
+        render_on_save(self, kwargs)
+        super().save(*args, **kwargs)
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -98,3 +185,496 @@ class Follow(models.Model):
                 name='unique_follow'
             )
         ]
+
+
+class GroupFollow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='group_follows'
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        verbose_name='Группа',
+        related_name='followers'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'group',),
+                name='unique_group_follow'
+            )
+        ]
+
+
+class Block(models.Model):
+    """Пользователь скрывает от себя посты и комментарии target.
+
+    Блокировка вдобавок запрещает target подписываться на пользователя
+    и комментировать его посты.
+    """
+    BLOCK = 'block'
+    MUTE = 'mute'
+    KIND_CHOICES = (
+        (BLOCK, 'Блокировка'),
+        (MUTE, 'Скрытие'),
+    )
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='blocks'
+    )
+    target = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Скрытый пользователь',
+        related_name='blocked_by'
+    )
+    kind = models.CharField('Тип', max_length=10, choices=KIND_CHOICES)
+    created = models.DateTimeField('Дата', auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'target',),
+                name='unique_block'
+            )
+        ]
+
+
+class Like(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='likes'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='likes'
+    )
+    created = models.DateTimeField(
+        'Дата',
+        auto_now_add=True
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post',),
+                name='unique_like'
+            )
+        ]
+
+
+class LikeCounter(models.Model):
+    """Шард счётчика лайков поста.
+
+    Счётчик поста разбит на LIKE_COUNTER_SHARDS строк, лайк меняет
+    случайную из них, поэтому популярный пост не превращается в одну
+    горячую строку. Итог - сумма по шардам.
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='like_shards'
+    )
+    shard = models.PositiveSmallIntegerField('Шард')
+    count = models.IntegerField('Лайки', default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('post', 'shard',),
+                name='unique_like_shard'
+            )
+        ]
+
+
+class MediaBlob(models.Model):
+    """Файл картинки и число постов, которые на него ссылаются.
+
+    Учитываются и посты, и архивные посты. Файл удаляется, когда
+    счётчик доходит до нуля, если только его не закрепила загрузка,
+    пост которой ещё не сохранён.
+    """
+    name = models.CharField('Файл', max_length=255, unique=True)
+    refcount = models.PositiveIntegerField('Ссылок', default=0)
+    pinned_until = models.DateTimeField(
+        'Закреплён до', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        return self.name
+
+
+class CacheInvalidation(models.Model):
+    """Ключ кэша объектов, сброшенный одним из процессов.
+
+    Остальные процессы читают журнал и удаляют ключ из своего кэша.
+    """
+    key = models.CharField('Ключ', max_length=200)
+    created = models.DateTimeField('Дата', auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Сброс кэша'
+        verbose_name_plural = 'Сбросы кэша'
+
+    def __str__(self):
+        return self.key
+
+
+class Tag(models.Model):
+    name = models.CharField('Тег', max_length=100, unique=True)
+
+    class Meta:
+        verbose_name = 'Тег'
+        verbose_name_plural = 'Теги'
+
+    def __str__(self):
+        return f'#{self.name}'
+
+
+class PostTag(models.Model):
+    """Тег поста.
+
+    Дата публикации копируется из поста, чтобы лента тега читалась
+    диапазоном индекса (tag, pub_date), а не поиском по тексту постов.
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='post_tags'
+    )
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+        verbose_name='Тег',
+        related_name='post_tags'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('post', 'tag'),
+                name='unique_post_tag'
+            )
+        ]
+        indexes = [
+            models.Index(fields=('tag', 'pub_date', 'post')),
+        ]
+
+
+class Mention(models.Model):
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='mentions'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='mentions'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('post', 'user'),
+                name='unique_mention'
+            )
+        ]
+
+
+class NotificationEvent(models.Model):
+    """Сырое событие для уведомлений.
+
+    Пишется одним INSERT в момент действия, в уведомления его сводит
+    команда deliver_notifications.
+    """
+    COMMENT = 'comment'
+    FOLLOW = 'follow'
+    MENTION = 'mention'
+    KIND_CHOICES = (
+        (COMMENT, 'Комментарий'),
+        (FOLLOW, 'Подписка'),
+        (MENTION, 'Упоминание'),
+    )
+
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Получатель',
+        related_name='notification_events'
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Инициатор',
+        related_name='+'
+    )
+    kind = models.CharField('Тип', max_length=20, choices=KIND_CHOICES)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='+'
+    )
+    created = models.DateTimeField(
+        'Дата',
+        auto_now_add=True
+    )
+
+
+class Notification(models.Model):
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Получатель',
+        related_name='notifications'
+    )
+    kind = models.CharField(
+        'Тип',
+        max_length=20,
+        choices=NotificationEvent.KIND_CHOICES
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='+'
+    )
+    last_actor = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+'
+    )
+    count = models.PositiveIntegerField('Событий', default=1)
+    is_read = models.BooleanField('Прочитано', default=False)
+    updated = models.DateTimeField('Дата')
+
+    class Meta:
+        ordering = ('-updated',)
+        indexes = [
+            models.Index(fields=('recipient', 'is_read')),
+        ]
+
+    def __str__(self):
+        if self.kind == NotificationEvent.MENTION:
+            # Упоминания сводятся по посту, а у поста один автор
+            return f'{self.last_actor} упомянул вас в посте'
+        if self.kind == NotificationEvent.COMMENT:
+            if self.count == 1:
+                return f'{self.last_actor} прокомментировал ваш пост'
+            return (f'{self.count} {plural(self.count, NEW_COMMENTS)} '
+                    'к вашему посту')
+        if self.count == 1:
+            return f'{self.last_actor} подписался на вас'
+        return f'{self.count} {plural(self.count, NEW_FOLLOWERS)}'
+
+
+NEW_COMMENTS = ('новый комментарий', 'новых комментария',
+                'новых комментариев')
+NEW_FOLLOWERS = ('новый подписчик', 'новых подписчика', 'новых подписчиков')
+
+
+def plural(number, forms):
+    """Выбирает форму слова для числа: 1 пост, 2 поста, 5 постов."""
+    if number % 10 == 1 and number % 100 != 11:
+        return forms[0]
+    if 2 <= number % 10 <= 4 and not 12 <= number % 100 <= 14:
+        return forms[1]
+    return forms[2]
+
+
+class DeletionTask(models.Model):
+    """Фоновое удаление пользователя со всеми его данными."""
+    PENDING = 'pending'
+    DONE = 'done'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (DONE, 'Завершено'),
+    )
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        verbose_name='Пользователь',
+        related_name='+'
+    )
+    username = models.CharField('Имя пользователя', max_length=150)
+    status = models.CharField(
+        'Статус',
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    deleted_rows = models.PositiveIntegerField('Удалено строк', default=0)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    finished = models.DateTimeField('Завершено', blank=True, null=True)
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Удаление пользователя'
+        verbose_name_plural = 'Удаления пользователей'
+
+    def __str__(self):
+        return self.username
+
+
+class ArchivedPost(models.Model):
+    """Старый пост, перенесённый из posts_post командой archive_posts.
+
+    id совпадает с id исходного поста, поэтому ссылки на пост остаются
+    рабочими.
+    """
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField('Текст поста')
+    text_html = models.TextField('HTML текста', blank=True)
+    excerpt_html = models.TextField('HTML начала текста', blank=True)
+    is_truncated = models.BooleanField('Текст длиннее начала', default=False)
+    pub_date = models.DateTimeField('Дата публикации')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор',
+        related_name='archived_posts'
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts',
+        blank=True,
+        null=True,
+        verbose_name='Группа',
+    )
+    image = models.ImageField(
+        'Картинка', upload_to='posts/', storage=storage, blank=True)
+    views = models.PositiveIntegerField('Просмотры', default=0)
+    like_count = models.IntegerField('Лайки', default=0)
+    archived = models.DateTimeField('Дата архивации', auto_now_add=True)
+
+    is_archived = True
+    FULL_TEXT_FIELDS = ('text', 'text_html')
+
+    class Meta:
+        ordering = ('-pub_date', '-id')
+        indexes = [
+            models.Index(fields=('author', 'pub_date')),
+        ]
+        verbose_name = 'Архивный пост'
+        verbose_name_plural = 'Архивные посты'
+
+    def __str__(self) -> str:
+        return self.text[:15]
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор',
+        related_name='archived_comments'
+    )
+    text = models.TextField(verbose_name='Текст комментария')
+    text_html = models.TextField('HTML текста', blank=True)
+    created = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ('id',)
+
+    def __str__(self):
+        return self.text
+
+
+class BulkJob(models.Model):
+    """Массовое действие над постами из админки, выполняемое порциями."""
+    MOVE_TO_GROUP = 'move_to_group'
+    REASSIGN_AUTHOR = 'reassign_author'
+    DELETE = 'delete'
+    PURGE_IMAGES = 'purge_images'
+    ACTION_CHOICES = (
+        (MOVE_TO_GROUP, 'Перенос в группу'),
+        (REASSIGN_AUTHOR, 'Смена автора'),
+        (DELETE, 'Удаление'),
+        (PURGE_IMAGES, 'Удаление картинок'),
+    )
+    PENDING = 'pending'
+    DONE = 'done'
+    STATUS_CHOICES = (
+        (PENDING, 'В очереди'),
+        (DONE, 'Завершено'),
+    )
+
+    action = models.CharField(
+        'Действие', max_length=20, choices=ACTION_CHOICES)
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        verbose_name='Группа',
+        related_name='+'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        verbose_name='Автор',
+        related_name='+'
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        verbose_name='Запустил',
+        related_name='+'
+    )
+    # id постов через запятую: выборка фиксируется при запуске
+    post_ids = models.TextField('Посты', editable=False)
+    total = models.PositiveIntegerField('Всего', default=0)
+    processed = models.PositiveIntegerField('Обработано', default=0)
+    status = models.CharField(
+        'Статус',
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=PENDING
+    )
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    finished = models.DateTimeField('Завершено', blank=True, null=True)
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Массовое действие'
+        verbose_name_plural = 'Массовые действия'
+
+    def __str__(self):
+        return f'{self.get_action_display()} №{self.pk}'
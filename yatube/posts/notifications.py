@@ -0,0 +1,92 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Notification, NotificationEvent
+
+
+def notify(recipient, actor, kind, post=None):
+    """Дешёвая запись события - один INSERT без чтения."""
+    if recipient == actor:
+        return
+    NotificationEvent.objects.create(
+        recipient=recipient, actor=actor, kind=kind, post=post)
+
+
+def deliver(batch_size=1000):
+    """Сводит очередную пачку событий в уведомления.
+
+    События одного типа к одному посту схлопываются в непрочитанное
+    уведомление получателя («5 новых комментариев»). Возвращает число
+    разобранных событий.
+    """
+    with transaction.atomic():
+        events = list(
+            NotificationEvent.objects.order_by('id')[:batch_size])
+        if not events:
+            return 0
+        groups = defaultdict(list)
+        for event in events:
+            groups[event.recipient_id, event.kind, event.post_id].append(
+                event)
+        now = timezone.now()
+        created = defaultdict(int)
+        for (recipient_id, kind, post_id), group in groups.items():
+            updated = Notification.objects.filter(
+                recipient_id=recipient_id,
+                kind=kind,
+                post_id=post_id,
+                is_read=False,
+            ).order_by().update(
+                count=F('count') + len(group),
+                last_actor_id=group[-1].actor_id,
+                updated=now,
+            )
+            if not updated:
+                Notification.objects.create(
+                    recipient_id=recipient_id,
+                    kind=kind,
+                    post_id=post_id,
+                    count=len(group),
+                    last_actor_id=group[-1].actor_id,
+                    updated=now,
+                )
+                created[recipient_id] += 1
+        NotificationEvent.objects.filter(
+            id__in=[event.id for event in events]).delete()
+    # deliver обычно работает в отдельном процессе команды, и сброс
+    # виден только его кэшу; воркеры обновят счётчики по истечении
+    # NOTIFICATIONS_UNREAD_TIMEOUT
+    cache.delete_many([_unread_key(recipient_id) for recipient_id in created])
+    return len(events)
+
+
+def unread_count(user):
+    """Число непрочитанных уведомлений, но не больше LIMIT + 1.
+
+    Считается по индексу (recipient, is_read) запросом с LIMIT
+    и ненадолго запоминается в кэше процесса.
+    """
+    key = _unread_key(user.id)
+    count = cache.get(key)
+    if count is None:
+        limit = settings.NOTIFICATIONS_UNREAD_LIMIT
+        count = len(Notification.objects.filter(
+            recipient=user, is_read=False).values_list('id')[:limit + 1])
+        cache.set(key, count, settings.NOTIFICATIONS_UNREAD_TIMEOUT)
+    return count
+
+
+def mark_read(user, ids):
+    """Помечает прочитанными показанные пользователю уведомления."""
+    Notification.objects.filter(
+        recipient=user, is_read=False, id__in=ids).update(is_read=True)
+    cache.delete(_unread_key(user.id))
+
+
+def _unread_key(user_id):
+    return f'notifications:unread:{user_id}'
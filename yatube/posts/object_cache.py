@@ -0,0 +1,250 @@
+"""Read-through кэш объектов Post, ArchivedPost и User.
+
+Объекты кэшируются по id, а User ещё и по естественному ключу
+(username), который ссылается на id; группы живут в реестре groups.
+Сохранение и удаление объекта сбрасывают его ключи через сигналы;
+массовые UPDATE и bulk_create сигналов не шлют, поэтому после них
+вызывают invalidate.
+Отсутствующие объекты тоже кэшируются, но на короткое время.
+
+Кэш у каждого процесса может быть свой, поэтому сброшенные ключи ещё
+пишутся в журнал CacheInvalidation в той же транзакции, что и правка.
+Не чаще раза в OBJECT_CACHE_CHECK_INTERVAL секунд процесс читает из
+журнала ключи, сброшенные после прошлой проверки, и удаляет их у себя.
+Так и метка отсутствующего объекта живёт в чужом процессе не дольше
+этого интервала после того, как объект создан.
+
+Пользователь кэшируется не целиком, а только полями из CACHED_FIELDS:
+хэш пароля, почта и прочие данные учётной записи в кэш не попадают.
+"""
+import hashlib
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import Http404
+from django.utils import timezone
+
+from .groups import registry as groups
+from .models import ArchivedPost, CacheInvalidation, Post, User
+
+NATURAL_KEYS = {
+    User: 'username',
+}
+# Поля, которые читаются из базы и хранятся в кэше; у остальных моделей
+# кэшируются все поля
+CACHED_FIELDS = {
+    User: ('username', 'first_name', 'last_name', 'is_active'),
+}
+# Метка отсутствующего объекта: несуществующие id и username, которые
+# перебирают сканеры, не ходят в базу до истечения NEGATIVE_CACHE_TIMEOUT
+MISSING = 'missing'
+# Сколько записей журнала читается одним запросом
+LOG_BATCH_SIZE = 1000
+
+
+class InvalidationLog:
+    """Журнал сброшенных ключей в базе, общий для всех процессов."""
+
+    def __init__(self):
+        self._last_id = None
+        self._checked = None
+        self._lock = threading.Lock()
+
+    def record(self, keys):
+        CacheInvalidation.objects.bulk_create(
+            CacheInvalidation(key=key) for key in keys)
+        # Старые записи никому не нужны: процесс, не читавший журнал
+        # дольше времени жизни объектов, его не читает (см. check)
+        expired = timezone.now() - timedelta(
+            seconds=2 * settings.OBJECT_CACHE_TIMEOUT)
+        CacheInvalidation.objects.filter(created__lt=expired).delete()
+
+    def check(self):
+        """Удаляет из кэша процесса ключи, сброшенные другими процессами.
+
+        Вызывается перед каждым чтением кэша, так что процесс ничего не
+        кэширует, не проверив журнал.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._checked is not None and (
+                    now - self._checked
+                    < settings.OBJECT_CACHE_CHECK_INTERVAL):
+                return
+            idle = self._checked is None or now - self._checked >= (
+                settings.OBJECT_CACHE_TIMEOUT
+                + settings.OBJECT_CACHE_CHECK_INTERVAL)
+            self._checked = now
+            if idle:
+                # Процесс только запущен или давно не читал кэш: всё,
+                # что он закэшировал раньше, уже истекло
+                self._last_id = CacheInvalidation.objects.aggregate(
+                    last_id=Max('id'))['last_id'] or 0
+                return
+            keys = set()
+            while True:
+                rows = list(CacheInvalidation.objects.filter(
+                    id__gt=self._last_id).order_by('id').values_list(
+                    'id', 'key')[:LOG_BATCH_SIZE])
+                if not rows:
+                    break
+                self._last_id = rows[-1][0]
+                keys.update(key for _, key in rows)
+            cache.delete_many(list(keys))
+
+
+invalidations = InvalidationLog()
+
+
+def object_key(model, pk, excerpt=False):
+    key = f'obj:{model._meta.label_lower}:{pk}'
+    # Посты для лент хранятся отдельно, без полного текста
+    return f'{key}:excerpt' if excerpt else key
+
+
+def natural_key(model, value):
+    # username может содержать символы, недопустимые в ключах
+    # memcached, поэтому в ключ идёт хэш значения
+    digest = hashlib.md5(str(value).encode()).hexdigest()
+    return f'obj:{model._meta.label_lower}:{NATURAL_KEYS[model]}:{digest}'
+
+
+def get(model, pk):
+    """Объект по id или None."""
+    return get_many(model, [pk]).get(int(pk))
+
+
+def get_by_natural_key(model, value):
+    """Объект по username или None."""
+    key = natural_key(model, value)
+    field = NATURAL_KEYS[model]
+    invalidations.check()
+    pk = cache.get(key)
+    if pk == MISSING:
+        return None
+    if pk is not None:
+        obj = get(model, pk)
+        # Ключ мог устареть после переименования объекта
+        if obj is not None and getattr(obj, field) == value:
+            return obj
+    obj = _queryset(model).filter(**{field: value}).first()
+    if obj is None:
+        cache.set(key, MISSING, settings.NEGATIVE_CACHE_TIMEOUT)
+    else:
+        cache.set(key, obj.pk, settings.OBJECT_CACHE_TIMEOUT)
+        cache.set(object_key(model, obj.pk), obj,
+                  settings.OBJECT_CACHE_TIMEOUT)
+    return obj
+
+
+def get_many(model, pks, excerpt=False):
+    """Словарь {id: объект}: кэш одним get_many, промахи - одним in_bulk.
+
+    Id, которых нет в базе, в словарь не попадают. С excerpt=True
+    поля model.FULL_TEXT_FIELDS не читаются из базы и не хранятся в кэше.
+    """
+    pks = {int(pk) for pk in pks}
+    keys = {object_key(model, pk, excerpt): pk for pk in pks}
+    invalidations.check()
+    cached = {
+        keys[key]: obj for key, obj in cache.get_many(list(keys)).items()
+    }
+    missing = pks - cached.keys()
+    found = {pk: obj for pk, obj in cached.items() if obj != MISSING}
+    if missing:
+        loaded = _queryset(model, excerpt).in_bulk(missing)
+        cache.set_many(
+            {object_key(model, pk, excerpt): obj
+             for pk, obj in loaded.items()},
+            settings.OBJECT_CACHE_TIMEOUT,
+        )
+        cache.set_many(
+            {object_key(model, pk, excerpt): MISSING
+             for pk in missing - loaded.keys()},
+            settings.NEGATIVE_CACHE_TIMEOUT,
+        )
+        found.update(loaded)
+    return found
+
+
+def _queryset(model, excerpt=False):
+    queryset = model.objects.all()
+    if model in CACHED_FIELDS:
+        queryset = queryset.only(*CACHED_FIELDS[model])
+    if excerpt:
+        queryset = queryset.defer(*model.FULL_TEXT_FIELDS)
+    return queryset
+
+
+def get_or_404(model, pk=None, **natural):
+    """Аналог get_object_or_404 по id или по естественному ключу."""
+    if pk is not None:
+        obj = get(model, pk)
+    else:
+        [value] = natural.values()
+        obj = get_by_natural_key(model, value)
+    if obj is None:
+        raise Http404(f'{model._meta.verbose_name} не найден')
+    return obj
+
+
+def get_visible_post(post_id):
+    """Видимый пост с автором и группой из кэша или None."""
+    posts = get_visible_posts([post_id])
+    return posts[0] if posts else None
+
+
+def get_visible_posts(ids, excerpt=False):
+    """Видимые посты с авторами и группами в порядке ids.
+
+    Повторяет условия Post.objects.visible() на закэшированных объектах,
+    так что скрытые после кэширования посты сразу пропадают.
+    """
+    found = get_many(Post, ids, excerpt)
+    posts = attach_related([
+        found[int(pk)] for pk in ids
+        if int(pk) in found and not found[int(pk)].pending_delete
+    ])
+    return [post for post in posts if post.author.is_active]
+
+
+def invalidate(model, pks, extra_keys=()):
+    keys = [object_key(model, pk) for pk in pks]
+    if hasattr(model, 'FULL_TEXT_FIELDS'):
+        keys += [object_key(model, pk, excerpt=True) for pk in pks]
+    keys += extra_keys
+    cache.delete_many(keys)
+    invalidations.record(keys)
+
+
+def attach_related(posts):
+    """Подставляет постам авторов и группы из кэша без запросов на пост.
+
+    Посты, автор которых уже удалён, отбрасываются.
+    """
+    authors = get_many(User, {post.author_id for post in posts})
+    posts = [post for post in posts if post.author_id in authors]
+    for post in posts:
+        post.author = authors[post.author_id]
+        group = groups.get(post.group_id) if post.group_id else None
+        # Без группы в реестре пост прочитает её из базы сам, а
+        # присвоенный None обнулил бы group_id
+        if group is not None:
+            post.group = group
+    return posts
+
+
+def forget(sender, instance, **kwargs):
+    """Обработчик post_save/post_delete: сбрасывает ключи объекта."""
+    extra_keys = []
+    if sender in NATURAL_KEYS:
+        extra_keys.append(natural_key(sender, getattr(
+            instance, NATURAL_KEYS[sender])))
+    invalidate(sender, [instance.pk], extra_keys)
+
+
+CACHED_MODELS = (ArchivedPost, Post, User)
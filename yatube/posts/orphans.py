@@ -0,0 +1,138 @@
+"""Поиск файлов картинок и миниатюр, на которые никто не ссылается.
+
+Файлы каталога и имена картинок из базы читаются как отсортированные
+потоки и сравниваются слиянием, поэтому память не зависит ни от числа
+файлов, ни от числа постов. Порядок имён в базе должен совпадать
+с питоновским сравнением строк - так сортирует SQLite (BINARY).
+
+Каталог читается потоком (os.scandir для локального хранилища) и
+сортируется порциями по SORT_CHUNK_SIZE имён: порции, не поместившиеся
+в одну, сливаются из временных файлов, так что и огромный плоский
+каталог posts/ не загружается в память целиком.
+"""
+import heapq
+import os
+import tempfile
+from contextlib import ExitStack
+from datetime import timedelta
+from itertools import islice
+
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from .models import ArchivedPost, Post
+
+
+# Сколько имён одного каталога сортируется в памяти
+SORT_CHUNK_SIZE = 10000
+
+
+def iter_files(storage, directory, chunk_size=SORT_CHUNK_SIZE):
+    """Имена файлов каталога и всех вложенных по возрастанию."""
+    if not storage.exists(directory):
+        return
+    for entry in _sorted(_scan(storage, directory), chunk_size):
+        path = f'{directory.rstrip("/")}/{entry}'
+        if entry.endswith('/'):
+            yield from iter_files(storage, path, chunk_size)
+        else:
+            yield path
+
+
+def _scan(storage, directory):
+    # Каталог сортируется со слешем на конце, как его содержимое
+    # в полных именах: 'a.jpg' < 'a/…'
+    try:
+        path = storage.path(directory)
+    except NotImplementedError:
+        # Удалённое хранилище отдаёт каталог только списком
+        dirs, files = storage.listdir(directory)
+        yield from (name + '/' for name in dirs)
+        yield from files
+        return
+    with os.scandir(path) as entries:
+        for entry in entries:
+            yield entry.name + '/' if entry.is_dir() else entry.name
+
+
+def _sorted(names, chunk_size):
+    """names по возрастанию; в памяти не больше chunk_size имён."""
+    names = iter(names)
+    chunk = sorted(islice(names, chunk_size))
+    if len(chunk) < chunk_size:
+        yield from chunk
+        return
+    with ExitStack() as stack:
+        runs = []
+        while chunk:
+            run = stack.enter_context(
+                tempfile.TemporaryFile('w+', encoding='utf-8'))
+            # Имена файлов из загрузок не содержат перевода строки
+            run.writelines(name + '\n' for name in chunk)
+            run.seek(0)
+            runs.append(line[:-1] for line in run)
+            chunk = sorted(islice(names, chunk_size))
+        yield from heapq.merge(*runs)
+
+
+def referenced_images():
+    """Имена картинок постов и архивных постов по возрастанию."""
+    streams = [
+        model.objects.exclude(image='').order_by('image')
+        .values_list('image', flat=True).distinct().iterator()
+        for model in (Post, ArchivedPost)
+    ]
+    previous = None
+    for name in heapq.merge(*streams):
+        if name != previous:
+            yield name
+            previous = name
+
+
+def find_orphans(files, referenced):
+    """Имена из files, которых нет в referenced; оба отсортированы."""
+    referenced = iter(referenced)
+    current = next(referenced, None)
+    for name in files:
+        while current is not None and current < name:
+            current = next(referenced, None)
+        if name != current:
+            yield name
+
+
+def find_stale_thumbnails(names, batch_size):
+    """Миниатюры из names, которых нет в хранилище ключей sorl.
+
+    Такие файлы остались от удалённых исходников: sorl их не выдаст,
+    а при нужде создаст заново. Существование ключей проверяется одним
+    запросом на порцию.
+    """
+    names = iter(names)
+    while True:
+        batch = list(islice(names, batch_size))
+        if not batch:
+            return
+        keys = {
+            add_prefix(ImageFile(name, default.storage).key): name
+            for name in batch
+        }
+        known = set(KVStore.objects.filter(key__in=keys).values_list(
+            'key', flat=True))
+        for key, name in keys.items():
+            if key not in known:
+                yield name
+
+
+def older_than(storage, names, age):
+    """Имена файлов, не менявшихся дольше age секунд.
+
+    Свежие файлы могут принадлежать загрузке, пост которой ещё
+    не сохранён.
+    """
+    border = timezone.now() - timedelta(seconds=age)
+    for name in names:
+        if storage.get_modified_time(name) < border:
+            yield name
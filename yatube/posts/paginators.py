@@ -0,0 +1,164 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Paginator
+from django.db import DatabaseError, connections
+from django.utils.functional import cached_property
+
+
+def estimate_count(queryset, table_estimate=False):
+    """Число строк выборки и признак того, что оно приблизительное.
+
+    До EXACT_COUNT_THRESHOLD строк считается точно - COUNT по выборке
+    с LIMIT дёшев при любом размере таблицы. Выше порога возвращается
+    оценка: для table_estimate=True - число строк таблицы из статистики
+    SQLite (sqlite_stat1, её обновляет команда analyze_db), иначе -
+    точный COUNT, закэшированный на ESTIMATED_COUNT_TIMEOUT секунд.
+    Оценка не бывает меньше порога: выборка его уже превысила.
+    """
+    threshold = settings.EXACT_COUNT_THRESHOLD
+    count = queryset.order_by()[:threshold + 1].count()
+    if count <= threshold:
+        return count, False
+    digest = hashlib.md5(str(queryset.query).encode()).hexdigest()
+    key = f'paginator:count:{digest}'
+    estimate = cache.get(key)
+    if estimate is None:
+        if table_estimate:
+            estimate = _table_rows(queryset)
+        if estimate is None:
+            estimate = queryset.count()
+        # Устаревшая статистика может быть меньше найденного
+        estimate = max(estimate, threshold + 1)
+        cache.set(key, estimate, settings.ESTIMATED_COUNT_TIMEOUT)
+    return estimate, True
+
+
+def _table_rows(queryset):
+    connection = connections[queryset.db]
+    if connection.vendor != 'sqlite':
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s',
+                [queryset.model._meta.db_table],
+            )
+            rows = [int(stat.split()[0]) for stat, in cursor.fetchall()]
+    except DatabaseError:
+        # ANALYZE ещё не запускался - таблицы статистики нет
+        return None
+    return max(rows) if rows else None
+
+
+class EstimatedPaginator(Paginator):
+    """Paginator, которому на больших выборках хватает оценки числа строк.
+
+    Шаблон показывает окно страниц вокруг текущей и «около 1,2 млн»
+    вместо точного числа, пока is_estimated. Оценка бывает ниже
+    настоящего числа строк, поэтому номер страницы ей не ограничивается:
+    страница за оценкой отдаётся, если в ней есть строки, а число строк
+    тогда поднимается, чтобы у страницы была ссылка на следующую. Оценка
+    бывает и выше: пустая страница перед ней считается концом выборки.
+    """
+
+    def __init__(self, *args, table_estimate=False, estimate=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.table_estimate = table_estimate
+        # Готовая пара (число строк, is_estimated), например из кэша
+        self.estimate = estimate
+
+    @cached_property
+    def _estimate(self):
+        if self.estimate is not None:
+            return self.estimate
+        query = getattr(self.object_list, 'query', None)
+        if query is None or not query.can_filter():
+            # Не QuerySet или уже срез - считаем как обычно
+            return super().count, False
+        return estimate_count(self.object_list, self.table_estimate)
+
+    @cached_property
+    def count(self):
+        return self._estimate[0]
+
+    @property
+    def is_estimated(self):
+        return self._estimate[1]
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if self.is_estimated and int(number) > 1:
+                # Пустоту такой страницы проверяет page()
+                return int(number)
+            raise
+
+    def get_page(self, number):
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            # Страница за оценкой пуста: считаем точно и отдаём последнюю
+            self._set_estimate((self.object_list.count(), False))
+            return super().get_page(self.num_pages)
+
+    def page(self, number):
+        if not self.is_estimated:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        # Оценка бывает и выше, и ниже настоящего числа строк, поэтому
+        # проверяется каждая страница, а не только страницы за оценкой
+        if _has_rows(self.object_list[top:top + 1]):
+            self._raise_count(top + 1)
+        else:
+            # Следующей страницы нет - эта последняя, и число строк
+            # теперь известно точно
+            rows = _row_count(self.object_list[bottom:top])
+            if not rows and number > 1:
+                raise EmptyPage('На этой странице нет записей')
+            self._set_estimate((bottom + rows, False))
+        return self._get_page(self.object_list[bottom:top], number, self)
+
+    def _raise_count(self, count):
+        self._set_estimate((max(self.count, count), True))
+
+    def _set_estimate(self, estimate):
+        # count и num_pages - cached_property, пересчитываем их
+        self.__dict__['_estimate'] = estimate
+        self.__dict__.pop('count', None)
+        self.__dict__.pop('num_pages', None)
+
+    @property
+    def count_display(self):
+        if self.count >= 10 ** 6:
+            value, unit = self.count / 10 ** 6, ' млн'
+        elif self.count >= 10 ** 3:
+            value, unit = self.count / 10 ** 3, ' тыс.'
+        else:
+            return str(self.count)
+        return f'{value:.1f}'.rstrip('0').rstrip('.').replace('.', ',') + unit
+
+    def _get_page(self, *args, **kwargs):
+        page = super()._get_page(*args, **kwargs)
+        # Номера страниц вокруг текущей вместо полного page_range
+        side = settings.PAGINATOR_PAGES_ON_EACH_SIDE
+        first = max(page.number - side, 1)
+        last = min(page.number + side, self.num_pages)
+        page.page_window = range(first, last + 1)
+        return page
+
+
+def _has_rows(object_list):
+    if hasattr(object_list, 'exists'):
+        return object_list.exists()
+    return bool(object_list)
+
+
+def _row_count(object_list):
+    if hasattr(object_list, 'exists'):
+        return object_list.count()
+    return len(object_list)
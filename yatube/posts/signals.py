@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import feeds, groups, media, tags
+from .models import ArchivedPost, Follow, Group, GroupFollow, Post
+from .object_cache import CACHED_MODELS, forget
+
+
+@receiver(post_save, sender=Post)
+def invalidate_group_feed(sender, instance, **kwargs):
+    # Главная и ленты подписок обновятся по истечении FEED_CACHE_TIMEOUT,
+    # а страницу группы автор ждёт увидеть с новым постом сразу
+    if instance.group_id:
+        feeds.invalidate(feeds.group_feed(instance.group_id))
+
+
+@receiver(post_save, sender=Post)
+def index_post_tags(sender, instance, update_fields, **kwargs):
+    if update_fields is None or 'text' in update_fields:
+        tags.index_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+@receiver(post_save, sender=GroupFollow)
+@receiver(post_delete, sender=GroupFollow)
+def invalidate_follow_feed(sender, instance, **kwargs):
+    feeds.invalidate(feeds.follow_feed(instance.user_id))
+
+
+for model in CACHED_MODELS:
+    post_save.connect(forget, sender=model)
+    post_delete.connect(forget, sender=model)
+
+post_save.connect(groups.invalidate, sender=Group)
+post_delete.connect(groups.invalidate, sender=Group)
+
+for model in (ArchivedPost, Post):
+    pre_save.connect(media.remember_image, sender=model)
+    post_save.connect(media.track_image, sender=model)
+    post_delete.connect(media.forget_image, sender=model)
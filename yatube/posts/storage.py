@@ -0,0 +1,66 @@
+"""Хранилище картинок с адресацией по содержимому.
+
+Имя файла - sha256 его байтов, разложенный по двум уровням каталогов:
+posts/ab/cd/abcd….jpg. Одинаковые загрузки попадают в один файл,
+а каталоги не разрастаются до сотен тысяч записей. Сколько постов
+ссылаются на файл, считает MediaBlob (см. posts.media); перед записью
+хранилище закрепляет его строку, чтобы файл не удалили до сохранения
+поста.
+"""
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CONTENT_NAME_RE = re.compile(
+    r'(?:.*/)?(?P<a>[0-9a-f]{2})/(?P<b>[0-9a-f]{2})/'
+    r'(?P=a)(?P=b)[0-9a-f]{60}(?:\.\w+)?')
+
+
+def content_name(name, content):
+    """Имя файла по хэшу содержимого в каталоге исходного имени."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    hexdigest = digest.hexdigest()
+    directory = os.path.dirname(name)
+    extension = os.path.splitext(name)[1].lower()
+    return os.path.join(
+        directory, hexdigest[:2], hexdigest[2:4], hexdigest + extension)
+
+
+def is_content_name(name):
+    """Записан ли файл этим хранилищем, а не задан как есть."""
+    return CONTENT_NAME_RE.fullmatch(name) is not None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = content_name(name, content)
+        # posts.media импортирует хранилище, поэтому импорт здесь
+        from .media import pin
+
+        # Закрепление не даёт удалить файл, пока пост не сохранён;
+        # проверять наличие файла можно только после него
+        pin(name)
+        if self.exists(name):
+            # Такой файл уже загружен - повторно не пишем, только
+            # обновляем время изменения, чтобы сборщик сирот не удалил
+            # его до сохранения ссылающегося поста
+            os.utime(self.path(name))
+            return name
+        # При гонке двух одинаковых загрузок FileSystemStorage сохранит
+        # вторую под именем с суффиксом - это лишь лишняя копия
+        return self._save(name, content)
+
+
+storage = ContentAddressedStorage()
@@ -0,0 +1,59 @@
+"""Индекс тегов и упоминаний постов.
+
+При сохранении текста поста теги и упоминания из него раскладываются
+по таблицам PostTag и Mention, так что лента тега и список
+упоминаний пользователя читаются по индексам.
+"""
+from django.db import transaction
+
+from . import feeds
+from .markup import hashtags, mentions
+from .models import Mention, NotificationEvent, PostTag, Tag, User
+from .notifications import notify
+
+
+def index_post(post, notify_mentions=True):
+    """Приводит теги и упоминания поста в соответствие с его текстом.
+
+    Новым упомянутым пользователям уходит уведомление, если не
+    передано notify_mentions=False.
+    """
+    with transaction.atomic():
+        added_tags = _sync_tags(post)
+        added_users = _sync_mentions(post)
+    for tag_id in added_tags:
+        feeds.invalidate(feeds.tag_feed(tag_id))
+    if notify_mentions:
+        for user in added_users:
+            notify(user, post.author, NotificationEvent.MENTION, post)
+
+
+def _sync_tags(post):
+    names = hashtags(post.text)
+    Tag.objects.bulk_create(
+        [Tag(name=name) for name in names], ignore_conflicts=True)
+    tag_ids = set(
+        Tag.objects.filter(name__in=names).values_list('pk', flat=True))
+    PostTag.objects.filter(post=post).exclude(tag_id__in=tag_ids).delete()
+    current = set(PostTag.objects.filter(post=post)
+                  .values_list('tag_id', flat=True))
+    added = tag_ids - current
+    PostTag.objects.bulk_create(
+        PostTag(post=post, tag_id=tag_id, pub_date=post.pub_date)
+        for tag_id in added
+    )
+    return added
+
+
+def _sync_mentions(post):
+    users = {
+        user.pk: user for user in User.objects.filter(
+            username__in=mentions(post.text)).exclude(pk=post.author_id)
+    }
+    Mention.objects.filter(post=post).exclude(user_id__in=users).delete()
+    current = set(Mention.objects.filter(post=post)
+                  .values_list('user_id', flat=True))
+    added = [user for pk, user in users.items() if pk not in current]
+    Mention.objects.bulk_create(
+        Mention(post=post, user=user) for user in added)
+    return added
@@ -0,0 +1,22 @@
+from django import template
+
+from ..thumbnails import get_pictures
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/picture.html', takes_context=True)
+def picture(context, image, lazy=True):
+    """<picture> с миниатюрами картинки поста разных ширин и форматов.
+
+    Миниатюры берутся из словаря pictures в контексте, который view
+    собирает на всю страницу; без него - из кэша по одной картинке.
+    """
+    if not image:
+        return {'picture': None}
+    pictures = context.get('pictures') or {}
+    # None в словаре - неудача, которую уже записали в журнал
+    if image.name not in pictures:
+        pictures = get_pictures([image])
+    found = pictures.get(image.name)
+    return {'picture': found, 'lazy': lazy}
@@ -0,0 +1,127 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.test import TestCase, Client
+
+from .. import feeds
+from ..bulk import run_step, start_job
+from ..models import BulkJob, Comment, DeletionTask, Follow, Group, Post
+
+User = get_user_model()
+
+
+class AdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group_slug')
+        for i in range(5):
+            post = Post.objects.create(
+                author=cls.author, text=f'Пост {i}', group=cls.group)
+            Comment.objects.create(
+                post=post, author=cls.author, text='Комментарий')
+        Follow.objects.create(user=cls.admin, author=cls.author)
+
+    def setUp(self) -> None:
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+
+    def test_changelists(self):
+        for address in (
+            '/admin/posts/post/',
+            '/admin/posts/comment/',
+            '/admin/posts/follow/',
+            '/admin/posts/group/',
+        ):
+            with self.subTest(address=address):
+                response = self.admin_client.get(address)
+                self.assertEqual(response.status_code, 200)
+
+    def test_post_changelist_queries_do_not_grow_with_rows(self):
+        self.admin_client.get('/admin/posts/post/')
+        with self.assertNumQueries(6) as context:
+            self.admin_client.get('/admin/posts/post/')
+        # Считается только ограниченная LIMIT выборка, а не вся таблица
+        self.assertTrue(all(
+            'LIMIT' in query['sql'] for query in context.captured_queries
+            if 'COUNT' in query['sql']))
+
+    def test_move_to_group_runs_in_batches(self):
+        other_group = Group.objects.create(title='Другая', slug='other')
+        ids = list(Post.objects.values_list('pk', flat=True))
+        data = {
+            'action': 'move_to_group',
+            '_selected_action': ids,
+            'select_across': '0',
+        }
+        response = self.admin_client.post('/admin/posts/post/', data)
+        self.assertTemplateUsed(response, 'admin/posts/post/bulk_action.html')
+        with self.settings(ADMIN_BATCH_SIZE=2):
+            response = self.admin_client.post(
+                '/admin/posts/post/',
+                {**data, 'apply': 'yes', 'group': other_group.pk})
+        job = BulkJob.objects.get()
+        self.assertRedirects(
+            response, f'/admin/posts/bulkjob/{job.pk}/change/')
+        self.assertEqual((job.processed, job.total), (2, 5))
+        while run_step(job, 2):
+            pass
+        self.assertEqual(job.status, BulkJob.DONE)
+        self.assertEqual(
+            Post.objects.filter(group=other_group).count(), len(ids))
+
+    def test_bulk_moves_invalidate_feeds(self):
+        other_group = Group.objects.create(title='Другая', slug='other')
+        new_author = User.objects.create_user(username='new_author')
+        with mock.patch.object(feeds, 'invalidate') as invalidate:
+            job = start_job(BulkJob.MOVE_TO_GROUP, Post.objects.all(),
+                            self.admin, 10, group=other_group)
+        invalidated = {call.args[0] for call in invalidate.call_args_list}
+        self.assertEqual(invalidated, {
+            feeds.group_feed(self.group.pk),
+            feeds.group_feed(other_group.pk),
+        })
+        self.assertEqual(job.status, BulkJob.DONE)
+        with mock.patch.object(feeds, 'invalidate') as invalidate:
+            start_job(BulkJob.REASSIGN_AUTHOR, Post.objects.all(),
+                      self.admin, 10, author=new_author)
+        invalidate.assert_called_once_with(feeds.follow_feed(self.admin.pk))
+
+    def test_delete_in_batches_marks_posts(self):
+        self.admin_client.post('/admin/posts/post/', {
+            'action': 'delete_in_batches',
+            '_selected_action': Post.objects.values_list('pk', flat=True),
+            'select_across': '1',
+            'apply': 'yes',
+        })
+        self.assertFalse(Post.objects.filter(pending_delete=False).exists())
+
+    def test_delete_confirmation_checks_dependent_perms(self):
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        staff.user_permissions.add(*Permission.objects.filter(
+            codename__in=('view_post', 'delete_post')))
+        client = Client()
+        client.force_login(staff)
+        post = Post.objects.first()
+        response = client.get(f'/admin/posts/post/{post.pk}/delete/')
+        # Комментарии к посту удалятся вместе с ним, а права на них нет
+        self.assertEqual(
+            response.context['perms_lacking'],
+            {Comment._meta.verbose_name})
+        response = self.admin_client.get(
+            f'/admin/posts/post/{post.pk}/delete/')
+        self.assertFalse(response.context['perms_lacking'])
+
+    def test_repeated_user_deletion_keeps_one_task(self):
+        for _ in range(2):
+            self.admin_client.post('/admin/auth/user/', {
+                'action': 'delete_selected',
+                '_selected_action': [self.author.pk],
+                'post': 'yes',
+            })
+        self.assertEqual(
+            DeletionTask.objects.filter(user=self.author).count(), 1)
@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from ..archive import ChainedPosts, archive_batch
+from ..likes import toggle_like
+from ..models import ArchivedPost, Comment, Post
+
+User = get_user_model()
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.old_post = Post.objects.create(author=cls.author, text='Старый')
+        Post.objects.filter(pk=cls.old_post.pk).update(
+            pub_date=timezone.now() - timedelta(days=400))
+        Comment.objects.create(
+            post=cls.old_post, author=cls.author, text='Старый комментарий')
+        toggle_like(cls.author, cls.old_post)
+        cls.new_post = Post.objects.create(author=cls.author, text='Новый')
+
+    def setUp(self) -> None:
+        self.guest_client = Client()
+
+    def test_archive_moves_old_posts(self):
+        moved = archive_batch(timezone.now() - timedelta(days=365), 10)
+        self.assertEqual(moved, 1)
+        self.assertFalse(Post.objects.filter(pk=self.old_post.pk).exists())
+        archived = ArchivedPost.objects.get(pk=self.old_post.pk)
+        self.assertEqual(archived.like_count, 1)
+        self.assertEqual(archived.comments.count(), 1)
+
+    def test_archived_posts_are_read_through(self):
+        archive_batch(timezone.now() - timedelta(days=365), 10)
+        response = self.guest_client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.old_post.id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Старый комментарий')
+        response = self.guest_client.get(reverse(
+            'posts:profile', kwargs={'username': self.author.username}))
+        self.assertEqual(response.context['post_num'], 2)
+        self.assertEqual(
+            [post.id for post in response.context['page_obj']],
+            [self.new_post.id, self.old_post.id])
+
+    def test_chained_posts_slices_across_sources(self):
+        chained = ChainedPosts(
+            Post.objects.filter(pk=self.new_post.pk),
+            Post.objects.filter(pk=self.old_post.pk))
+        self.assertEqual(chained.count(), 2)
+        self.assertEqual(chained[1:2], [self.old_post])
+        self.assertEqual(chained[0:5], [self.new_post, self.old_post])
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from ..blocks import exclude_authors, excluded_authors
+from ..models import Block, Comment, Follow, Post
+
+User = get_user_model()
+
+
+class BlockTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.troll = User.objects.create_user(username='troll')
+        cls.author = User.objects.create_user(username='author')
+        cls.troll_post = Post.objects.create(author=cls.troll, text='Тролль')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_mute_hides_posts_and_comments(self):
+        Comment.objects.create(
+            post=self.post, author=self.troll, text='Комментарий тролля')
+        self.client.get(reverse('posts:index'))
+        self.client.post(reverse('posts:profile_mute', args=['troll']))
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        self.assertEqual(list(response.context['comments']), [])
+        # Остальные видят ленту целиком
+        response = Client().get(reverse('posts:index'))
+        self.assertEqual(len(response.context['page_obj']), 2)
+        self.client.post(reverse('posts:profile_unblock', args=['troll']))
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_block_drops_follows_and_forbids_comments(self):
+        Follow.objects.create(user=self.troll, author=self.reader)
+        self.client.post(reverse('posts:profile_block', args=['troll']))
+        self.assertFalse(Follow.objects.filter(user=self.troll).exists())
+        own_post = Post.objects.create(author=self.reader, text='Мой пост')
+        troll_client = Client()
+        troll_client.force_login(self.troll)
+        troll_client.get(reverse('posts:profile_follow', args=['reader']))
+        troll_client.post(
+            reverse('posts:add_comment', args=[own_post.pk]),
+            {'text': 'Спам'})
+        self.assertFalse(Follow.objects.filter(user=self.troll).exists())
+        self.assertFalse(own_post.comments.exists())
+
+    def test_changes_from_other_processes_apply_at_once(self):
+        self.assertEqual(excluded_authors(self.reader), ())
+        # bulk_create не шлёт сигналов, как и правка в чужом процессе
+        Block.objects.bulk_create([
+            Block(user=self.reader, target=self.troll, kind=Block.MUTE)])
+        self.assertEqual(excluded_authors(self.reader), (self.troll.pk,))
+        Block.objects.filter(user=self.reader).delete()
+        Block.objects.bulk_create([
+            Block(user=self.reader, target=self.author, kind=Block.MUTE)])
+        self.assertEqual(excluded_authors(self.reader), (self.author.pk,))
+
+    @override_settings(BLOCKS_INLINE_LIMIT=0)
+    def test_large_lists_use_subquery(self):
+        Block.objects.create(
+            user=self.reader, target=self.troll, kind=Block.MUTE)
+        posts = exclude_authors(Post.objects.all(), self.reader)
+        self.assertIn('EXISTS', str(posts.query))
+        self.assertEqual(list(posts), [self.post])
+        Follow.objects.create(user=self.reader, author=self.troll)
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [self.post])
@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..counters import BufferedCounter, post_views
+from ..models import Post
+
+User = get_user_model()
+
+
+class BufferedCounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Тестовый пост',
+        )
+
+    def setUp(self) -> None:
+        post_views.flush()
+        Post.objects.filter(pk=self.post.pk).update(views=0)
+
+    def test_increments_are_buffered_until_threshold(self):
+        counter = BufferedCounter(
+            Post, 'views', flush_interval=3600, flush_threshold=3)
+        counter.increment(self.post.pk)
+        counter.increment(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 0)
+        self.assertEqual(counter.pending(self.post.pk), 2)
+        counter.increment(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 3)
+        self.assertEqual(counter.pending(self.post.pk), 0)
+
+    def test_post_detail_counts_views(self):
+        client = Client()
+        address = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id})
+        client.get(address)
+        response = client.get(address)
+        self.assertEqual(response.context['views'], 2)
+        post_views.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 2)
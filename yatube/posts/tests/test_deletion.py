@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..deletion import (
+    process_posts, process_task, schedule_posts_deletion,
+    schedule_user_deletion
+)
+from ..likes import toggle_like
+from ..models import Comment, DeletionTask, Follow, LikeCounter, Post
+
+User = get_user_model()
+
+
+class DeletionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.user = User.objects.create_user(username='user')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост {i}')
+            for i in range(3)
+        ]
+        cls.other_post = Post.objects.create(author=cls.user, text='Чужой')
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.user, text='Комментарий')
+        Comment.objects.create(
+            post=cls.other_post, author=cls.author, text='Комментарий')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        toggle_like(cls.author, cls.other_post)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_pending_posts_are_hidden_and_deleted_in_batches(self):
+        schedule_posts_deletion(
+            Post.objects.filter(pk=self.posts[0].pk), batch_size=1)
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertNotIn(self.posts[0], response.context['page_obj'])
+        response = self.guest_client.get(reverse(
+            'posts:post_detail', kwargs={'post_id': self.posts[0].id}))
+        self.assertEqual(response.status_code, 404)
+        while process_posts(batch_size=1):
+            pass
+        self.assertFalse(Post.objects.filter(pk=self.posts[0].pk).exists())
+        self.assertEqual(Post.objects.count(), 3)
+
+    def test_user_deletion_runs_in_steps(self):
+        task = schedule_user_deletion(self.author)
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(
+            list(response.context['page_obj']), [self.other_post])
+        steps = 0
+        while task.status == DeletionTask.PENDING:
+            process_task(task, batch_size=2)
+            steps += 1
+        self.assertGreater(steps, 2)
+        self.assertFalse(User.objects.filter(username='author').exists())
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertFalse(Comment.objects.filter(author=self.author).exists())
+        self.assertFalse(Follow.objects.exists())
+        total = sum(LikeCounter.objects.filter(
+            post=self.other_post).values_list('count', flat=True))
+        self.assertEqual(total, 0)
+        task.refresh_from_db()
+        self.assertIsNone(task.user)
+        self.assertEqual(task.status, DeletionTask.DONE)
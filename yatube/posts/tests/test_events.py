@@ -0,0 +1,117 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from ..broker import broker
+from ..blocks import set_block
+from ..models import Block, Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(SSE_POLL_INTERVAL=0, SSE_HEARTBEAT=0)
+class EventStreamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def open_stream(self, url, client=None, **extra):
+        response = (client or Client()).get(url, **extra)
+        self.addCleanup(response.close)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return response, iter(response.streaming_content)
+
+    def post_event_id(self, post):
+        return f'id: {post.pub_date.isoformat()},{post.pk}\n'.encode()
+
+    def test_index_events_stream(self):
+        response, stream = self.open_stream(reverse('posts:index_events'))
+        self.assertEqual(
+            next(stream), b'retry: 5000\n' + self.post_event_id(self.post)
+            + b'\n')
+        self.assertEqual(next(stream), b': ping\n\n')
+        # Пост мог сохранить любой процесс: брокер узнаёт о нём из базы
+        Post.objects.create(author=self.author, text='Новый')
+        last = Post.objects.create(author=self.author, text='Ещё один')
+        self.assertEqual(
+            next(stream), b'event: new_posts\n' + self.post_event_id(last)
+            + b'data: {"count": 2}\n\n')
+        self.assertEqual(next(stream), b': ping\n\n')
+
+    def test_posts_since_rendered_page_are_counted(self):
+        """Посты, появившиеся между рендером и подпиской, не теряются."""
+        url = reverse('posts:index_events') + '?' + (
+            f'pub_date={self.post.pub_date.isoformat()}'
+            .replace('+', '%2B') + f'&id={self.post.pk}')
+        newer = Post.objects.create(
+            author=self.author, text='Новый',
+            pub_date=self.post.pub_date + timedelta(seconds=1))
+        response, stream = self.open_stream(url)
+        next(stream)
+        self.assertEqual(
+            next(stream), b'event: new_posts\n' + self.post_event_id(newer)
+            + b'data: {"count": 1}\n\n')
+
+    def test_last_event_id_resumes_stream(self):
+        newer = Post.objects.create(
+            author=self.author, text='Новый',
+            pub_date=self.post.pub_date + timedelta(seconds=1))
+        response, stream = self.open_stream(
+            reverse('posts:index_events'),
+            HTTP_LAST_EVENT_ID=f'{newer.pub_date.isoformat()},{newer.pk}')
+        self.assertEqual(
+            next(stream), b'retry: 5000\n' + self.post_event_id(newer)
+            + b'\n')
+        self.assertEqual(next(stream), b': ping\n\n')
+
+    def test_blocked_authors_are_not_counted(self):
+        reader = User.objects.create_user(username='reader')
+        set_block(reader, self.author, Block.MUTE)
+        client = Client()
+        client.force_login(reader)
+        response, stream = self.open_stream(
+            reverse('posts:index_events'), client)
+        next(stream)
+        Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(next(stream), b': ping\n\n')
+
+    def test_streams_share_one_poll(self):
+        first, first_stream = self.open_stream(reverse('posts:index_events'))
+        second, second_stream = self.open_stream(
+            reverse('posts:index_events'))
+        next(first_stream)
+        next(second_stream)
+        Post.objects.create(author=self.author, text='Новый')
+        with override_settings(SSE_POLL_INTERVAL=60), \
+                mock.patch.object(
+                    broker, '_poll', wraps=broker._poll) as poll:
+            broker._last_poll = None
+            broker.poll_if_due()
+            self.assertTrue(next(first_stream).startswith(b'event:'))
+            self.assertTrue(next(second_stream).startswith(b'event:'))
+        self.assertEqual(poll.call_count, 1)
+
+    def test_comment_events_stream(self):
+        response, stream = self.open_stream(
+            reverse('posts:comment_events', args=[self.post.pk]))
+        self.assertEqual(next(stream), b'retry: 5000\n\n')
+        self.assertEqual(next(stream), b': ping\n\n')
+        comment = Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий')
+        self.assertEqual(
+            next(stream), f'event: new_comments\nid: {comment.pk}\n'
+            'data: {"count": 1}\n\n'.encode())
+
+    def test_index_passes_page_top_to_stream(self):
+        cache.clear()
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, f'&id={self.post.pk}')
+
+    def test_follow_events_redirect_for_anonymous(self):
+        response = Client().get(reverse('posts:follow_events'))
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,151 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..feeds import MergedFeed
+from ..likes import toggle_like
+from ..models import Follow, Group, GroupFollow, Post
+
+User = get_user_model()
+
+
+class FeedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_cached_page_skips_post_queries(self):
+        Client().get(reverse('posts:index'))
+        # Остаётся только запрос счётчиков лайков страницы
+        with self.assertNumQueries(1):
+            response = Client().get(reverse('posts:index'))
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+    def test_entries_are_shared_but_likes_are_personal(self):
+        toggle_like(self.reader, self.post)
+        Client().get(reverse('posts:index'))
+        response = self.reader_client.get(reverse('posts:index'))
+        self.assertTrue(response.context['page_obj'][0].liked)
+        response = Client().get(reverse('posts:index'))
+        self.assertFalse(response.context['page_obj'][0].liked)
+
+    def test_hidden_post_leaves_cached_feed(self):
+        Client().get(reverse('posts:index'))
+        self.post.pending_delete = True
+        self.post.save()
+        response = Client().get(reverse('posts:index'))
+        self.assertEqual(list(response.context['page_obj']), [])
+
+    def test_new_group_post_shows_at_once(self):
+        url = reverse('posts:group_list', kwargs={'slug': 'group'})
+        Client().get(url)
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Новый')
+        response = Client().get(url)
+        self.assertEqual(response.context['page_obj'][0], post)
+
+    def test_follow_resets_follow_feed(self):
+        url = reverse('posts:follow_index')
+        self.reader_client.get(url)
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(url)
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+
+class MergedFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        GroupFollow.objects.create(user=cls.reader, group=cls.group)
+        cls.posts = [
+            Post.objects.create(author=cls.author, text='Автор'),
+            Post.objects.create(
+                author=cls.other, group=cls.group, text='Группа'),
+            Post.objects.create(
+                author=cls.author, group=cls.group, text='Оба'),
+            Post.objects.create(author=cls.other, text='Чужой'),
+        ]
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_merge_is_ordered_and_deduplicated(self):
+        feed = MergedFeed(
+            Post.objects.filter(author=self.author),
+            Post.objects.filter(group=self.group),
+        )
+        expected = [post.pk for post in reversed(self.posts[:3])]
+        self.assertEqual(feed[0:10], expected)
+        self.assertEqual(feed[1:2], expected[1:2])
+        self.assertEqual(feed.count(), 3)
+
+    def test_limit_caps_depth(self):
+        feed = MergedFeed(
+            Post.objects.filter(author=self.author),
+            Post.objects.filter(group=self.group),
+            limit=2,
+        )
+        self.assertEqual(feed.count(), 2)
+        with self.assertNumQueries(2) as context:
+            self.assertEqual(feed[1:10], [self.posts[1].pk])
+        # Каждый источник читается не дальше предела
+        self.assertTrue(all(
+            'LIMIT 2' in query['sql'] for query in context.captured_queries))
+
+    @override_settings(NUM_OF_DISPLAYED_POSTS=2)
+    def test_follow_feed_merges_authors_and_groups(self):
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:follow_index')
+        response = client.get(url)
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [self.posts[2], self.posts[1]])
+        response = client.get(url, {'page': 2})
+        self.assertEqual(list(response.context['page_obj']), [self.posts[0]])
+
+    def test_cached_follow_page_skips_merge_queries(self):
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:follow_index')
+        client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(len(response.context['page_obj']), 3)
+        # Ни подписки, ни посты источников не читаются
+        self.assertFalse(any(
+            'posts_post' in query['sql'] or 'posts_follow' in query['sql']
+            for query in context.captured_queries))
+
+    def test_group_follow_and_unfollow(self):
+        client = Client()
+        client.force_login(self.other)
+        response = client.get(reverse('posts:group_follow', args=['group']))
+        self.assertEqual(response.status_code, 405)
+        self.assertFalse(GroupFollow.objects.filter(user=self.other).exists())
+        client.post(reverse('posts:group_follow', args=['group']))
+        self.assertTrue(GroupFollow.objects.filter(
+            user=self.other, group=self.group).exists())
+        client.post(reverse('posts:group_unfollow', args=['group']))
+        self.assertFalse(GroupFollow.objects.filter(
+            user=self.other, group=self.group).exists())
@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from ..models import Follow
+
+User = get_user_model()
+
+
+@override_settings(FOLLOWS_PER_PAGE=2)
+class FollowListTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.fans = [
+            User.objects.create_user(username=f'fan{i}') for i in range(3)]
+        for fan in cls.fans:
+            Follow.objects.create(user=fan, author=cls.author)
+        # fan0 и author подписаны друг на друга
+        Follow.objects.create(user=cls.author, author=cls.fans[0])
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_followers_keyset_pages(self):
+        url = reverse('posts:followers_json', args=['author'])
+        first = self.client.get(url).json()
+        self.assertEqual(
+            [row['username'] for row in first['results']], ['fan2', 'fan1'])
+        second = self.client.get(url, {'after': first['next']}).json()
+        self.assertEqual(
+            [row['username'] for row in second['results']], ['fan0'])
+        self.assertIsNone(second['next'])
+
+    def test_follows_you_flags_in_one_query(self):
+        url = reverse('posts:following_json', args=['fan0'])
+        self.client.get(url)
+        # Сессия, пользователь запроса, страница подписок и флаги
+        # «подписан на вас»; сами пользователи берутся из кэша
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(response.json()['results'], [
+            {'id': response.json()['results'][0]['id'],
+             'username': 'author', 'follows_you': False},
+        ])
+        response = self.client.get(
+            reverse('posts:followers', args=['author']),
+            {'after': Follow.objects.get(user=self.fans[1]).id})
+        self.assertEqual(
+            [entry.follows_you for entry in response.context['entries']],
+            [True])
+        self.assertContains(response, 'подписан на вас')
@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..forms import PostForm
+from ..groups import registry
+from ..models import Group
+
+
+class GroupRegistryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_lookups_skip_database(self):
+        registry.all()
+        with self.assertNumQueries(0):
+            self.assertEqual(registry.get_by_slug('group'), self.group)
+            self.assertEqual(registry.get(self.group.pk), self.group)
+            self.assertIsNone(registry.get_by_slug('missing'))
+
+    def test_save_and_delete_refresh_registry(self):
+        registry.all()
+        other = Group.objects.create(title='Другая', slug='other')
+        self.assertEqual(registry.get_by_slug('other'), other)
+        other.delete()
+        self.assertIsNone(registry.get_by_slug('other'))
+
+    def test_form_choices_come_from_registry(self):
+        registry.all()
+        with self.assertNumQueries(0):
+            html = str(PostForm()['group'])
+        self.assertIn('Группа', html)
+
+    def test_changes_from_other_processes_are_noticed(self):
+        registry.all()
+        # Чужой процесс: сигналы этого процесса о правках не узнают
+        Group.objects.bulk_create([Group(title='Другая', slug='other')])
+        other = Group.objects.get(slug='other')
+        self.assertEqual(registry.get(other.pk), other)
+        Group.objects.filter(pk=other.pk).update(
+            slug='renamed', updated=timezone.now())
+        self.assertEqual(registry.get_by_slug('other'), other)
+        with override_settings(GROUPS_CHECK_INTERVAL=0):
+            self.assertIsNone(registry.get_by_slug('other'))
+            self.assertEqual(registry.get_by_slug('renamed'), other)
@@ -0,0 +1,111 @@
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..images import normalize_image
+from ..models import Post
+from .test_media import upload as gif_upload
+
+User = get_user_model()
+
+
+def make_upload(size, mode='RGB', color=(200, 30, 30), image_format='PNG',
+                **options):
+    buffer = BytesIO()
+    Image.new(mode, size, color).save(buffer, image_format, **options)
+    extension = image_format.lower()
+    return SimpleUploadedFile(
+        f'photo.{extension}', buffer.getvalue(), f'image/{extension}')
+
+
+def open_result(upload):
+    upload.seek(0)
+    return Image.open(BytesIO(upload.read()))
+
+
+@override_settings(IMAGE_MAX_SIDE=100)
+class NormalizeImageTests(SimpleTestCase):
+    def test_large_image_is_downscaled_to_jpeg(self):
+        upload = make_upload((400, 200))
+        with self.assertLogs('posts.images', 'INFO'):
+            result = normalize_image(upload)
+        image = open_result(result)
+        self.assertEqual(image.format, 'JPEG')
+        self.assertEqual(image.size, (100, 50))
+        self.assertTrue(result.name.endswith('.jpg'))
+
+    def test_exif_is_applied_and_stripped(self):
+        exif = Image.Exif()
+        # Orientation = 6: картинку нужно повернуть на 90°
+        exif[0x0112] = 6
+        upload = make_upload(
+            (80, 40), image_format='JPEG', exif=exif.tobytes())
+        image = open_result(normalize_image(upload))
+        self.assertEqual(image.size, (40, 80))
+        self.assertNotIn('exif', image.info)
+
+    def test_transparency_is_kept_in_png(self):
+        upload = make_upload((400, 400), 'RGBA', (0, 0, 0, 0))
+        image = open_result(normalize_image(upload))
+        self.assertEqual(image.format, 'PNG')
+        self.assertEqual(image.mode, 'RGBA')
+
+    def test_transparent_color_key_is_kept(self):
+        upload = make_upload((400, 400), transparency=(200, 30, 30))
+        image = open_result(normalize_image(upload))
+        self.assertEqual(image.format, 'PNG')
+        self.assertEqual(image.getchannel('A').getextrema(), (0, 0))
+
+    def test_profile_is_dropped_with_color_space(self):
+        cmyk = make_upload((400, 200), 'CMYK', (0, 0, 0, 0), 'JPEG',
+                           icc_profile=b'cmyk profile')
+        self.assertNotIn('icc_profile', open_result(
+            normalize_image(cmyk)).info)
+        rgb = make_upload((400, 200), image_format='JPEG',
+                          icc_profile=b'rgb profile')
+        self.assertEqual(
+            open_result(normalize_image(rgb)).info['icc_profile'],
+            b'rgb profile')
+
+    def test_small_clean_image_is_kept_when_not_smaller(self):
+        upload = gif_upload()
+        self.assertIs(normalize_image(upload), upload)
+
+    @override_settings(IMAGE_MAX_PIXELS=100 * 100)
+    def test_decompression_bomb_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            normalize_image(make_upload((101, 100)))
+
+    @override_settings(IMAGE_MAX_UPLOAD_SIZE=10)
+    def test_large_file_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            normalize_image(make_upload((10, 10)))
+
+
+class UploadLimitTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    @override_settings(IMAGE_MAX_UPLOAD_SIZE=100)
+    def test_large_upload_is_cut_off(self):
+        self.client.force_login(self.author)
+        with mock.patch(
+                'django.core.files.uploadhandler.'
+                'TemporaryFileUploadHandler.receive_data_chunk') as write:
+            response = self.client.post(
+                reverse('posts:post_edit', args=[self.post.pk]),
+                {'text': 'Новый текст', 'image': make_upload((300, 300))})
+        # Файл не пишется на диск дальше предела
+        write.assert_not_called()
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 100\xa0байт')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Пост')
@@ -0,0 +1,57 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..likes import annotate_likes
+from ..models import Like, LikeCounter, Post
+
+User = get_user_model()
+
+
+class LikeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.user = User.objects.create_user(username='user')
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Тестовый пост',
+        )
+
+    def setUp(self) -> None:
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_like_toggle(self):
+        address = reverse(
+            'posts:like_toggle', kwargs={'post_id': self.post.id})
+        response = self.authorized_client.post(address)
+        self.assertRedirects(response, reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}))
+        self.assertTrue(
+            Like.objects.filter(user=self.user, post=self.post).exists())
+        self.authorized_client.post(address)
+        self.assertFalse(
+            Like.objects.filter(user=self.user, post=self.post).exists())
+        total = sum(LikeCounter.objects.filter(
+            post=self.post).values_list('count', flat=True))
+        self.assertEqual(total, 0)
+
+    def test_like_toggle_requires_post(self):
+        response = self.authorized_client.get(
+            reverse('posts:like_toggle', kwargs={'post_id': self.post.id}))
+        self.assertEqual(response.status_code, 405)
+
+    def test_feed_shows_likes(self):
+        self.authorized_client.post(
+            reverse('posts:like_toggle', kwargs={'post_id': self.post.id}))
+        cache.clear()
+        response = self.authorized_client.get(reverse('posts:index'))
+        first_post = response.context['page_obj'][0]
+        self.assertEqual(first_post.like_count, 1)
+        self.assertTrue(first_post.liked)
+        [post] = annotate_likes([self.post], self.author)
+        self.assertEqual(post.like_count, 1)
+        self.assertFalse(post.liked)
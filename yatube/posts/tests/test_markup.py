@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from ..markup import make_excerpt, render_text
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class RenderTextTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    def test_text_is_escaped_and_split_into_paragraphs(self):
+        self.assertEqual(
+            render_text('<b>раз</b>\nдва\n\nтри'),
+            '<p>&lt;b&gt;раз&lt;/b&gt;<br>два</p>\n\n<p>три</p>')
+
+    def test_links_tags_and_mentions(self):
+        html = render_text(
+            'См. https://example.com/a?b=1&c=2. #новости @author @nobody')
+        self.assertIn(
+            '<a href="https://example.com/a?b=1&amp;c=2" rel="nofollow">',
+            html)
+        tag_url = reverse('posts:tag_posts', args=['новости'])
+        self.assertIn(
+            f'<a class="hashtag" href="{tag_url}">#новости</a>', html)
+        self.assertIn(
+            f'<a href="{reverse("posts:profile", args=["author"])}">'
+            '@author</a>', html)
+        self.assertIn(' @nobody', html)
+
+    def test_save_renders_html(self):
+        post = Post.objects.create(author=self.author, text='Пост #тег')
+        self.assertIn('#тег</a>', post.text_html)
+        post.text = 'Новый текст'
+        post.save(update_fields=('text',))
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, '<p>Новый текст</p>')
+        comment = Comment.objects.create(
+            post=post, author=self.author, text='a\nb')
+        self.assertEqual(comment.text_html, '<p>a<br>b</p>')
+
+
+@override_settings(POST_EXCERPT_LENGTH=20)
+class ExcerptTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_excerpt_cuts_on_word_boundary(self):
+        self.assertEqual(make_excerpt('коротко', 20), ('коротко', False))
+        self.assertEqual(
+            make_excerpt('раз два https://example.com', 12),
+            ('раз два…', True))
+
+    def test_feed_shows_excerpt_without_full_text(self):
+        post = Post.objects.create(
+            author=self.author, text='Начало поста и очень длинный хвост')
+        self.assertTrue(post.is_truncated)
+        response = Client().get(reverse('posts:index'))
+        feed_post = response.context['page_obj'][0]
+        self.assertEqual(
+            feed_post.get_deferred_fields(), set(Post.FULL_TEXT_FIELDS))
+        self.assertContains(response, 'Начало поста и очень…')
+        self.assertNotContains(response, 'хвост')
+        self.assertContains(response, 'Читать дальше')
+        response = Client().get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertContains(response, 'хвост')
@@ -0,0 +1,130 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+
+from ..archive import archive_batch
+from ..media import release
+from ..models import ArchivedPost, MediaBlob, Post
+from ..storage import storage
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+OTHER_GIF = SMALL_GIF[:-3] + b'\x0B\x00\x3B'
+
+
+def upload(content=SMALL_GIF, name='small.GIF'):
+    return SimpleUploadedFile(
+        name=name, content=content, content_type='image/gif')
+
+
+# Без закрепления файл удаляется сразу с последней ссылкой
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, MEDIA_PIN_TIMEOUT=0)
+class MediaTests(TransactionTestCase):
+    # Файлы удаляются в on_commit, поэтому тесты идут без общей
+    # транзакции TestCase
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self) -> None:
+        self.author = User.objects.create_user(username='author')
+
+    def create_post(self, content=SMALL_GIF):
+        return Post.objects.create(
+            author=self.author, text='Пост', image=upload(content))
+
+    def refcount(self, name):
+        return MediaBlob.objects.get(name=name).refcount
+
+    def test_name_is_content_hash_in_fanout_directory(self):
+        name = self.create_post().image.name
+        directory, filename = os.path.split(name)
+        digest, extension = os.path.splitext(filename)
+        self.assertEqual(extension, '.gif')
+        self.assertEqual(len(digest), 64)
+        self.assertEqual(
+            directory, os.path.join('posts', digest[:2], digest[2:4]))
+        self.assertTrue(storage.exists(name))
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.create_post()
+        second = self.create_post()
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(self.refcount(first.image.name), 2)
+        self.assertNotEqual(
+            self.create_post(OTHER_GIF).image.name, first.image.name)
+
+    def test_file_deleted_with_last_reference(self):
+        first = self.create_post()
+        second = self.create_post()
+        name = first.image.name
+        first.delete()
+        self.assertTrue(storage.exists(name))
+        self.assertEqual(self.refcount(name), 1)
+        second.delete()
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(MediaBlob.objects.filter(name=name).exists())
+
+    def test_reupload_keeps_file_deleted_meanwhile(self):
+        post = self.create_post()
+        name = post.image.name
+        with transaction.atomic():
+            post.delete()
+            # Та же картинка загружается, пока удаление не зафиксировано
+            with self.settings(MEDIA_PIN_TIMEOUT=60):
+                self.assertEqual(storage.save('posts/again.gif', upload()),
+                                 name)
+        self.assertTrue(storage.exists(name))
+        Post.objects.create(author=self.author, text='Пост', image=name)
+        self.assertEqual(self.refcount(name), 1)
+
+    def test_replacing_image_moves_reference(self):
+        post = self.create_post()
+        old_name = post.image.name
+        post = Post.objects.get(pk=post.pk)
+        post.image = upload(OTHER_GIF)
+        post.save()
+        self.assertEqual(self.refcount(post.image.name), 1)
+        self.assertFalse(MediaBlob.objects.filter(name=old_name).exists())
+        self.assertFalse(storage.exists(old_name))
+
+    def test_saving_without_image_change_keeps_count(self):
+        post = self.create_post()
+        post = Post.objects.get(pk=post.pk)
+        post.text = 'Другой текст'
+        post.save()
+        self.assertEqual(self.refcount(post.image.name), 1)
+
+    def test_archive_keeps_reference(self):
+        post = self.create_post()
+        Post.objects.filter(pk=post.pk).update(
+            pub_date=timezone.now() - timedelta(days=400))
+        archive_batch(timezone.now() - timedelta(days=365), 10)
+        self.assertEqual(self.refcount(post.image.name), 1)
+        self.assertTrue(storage.exists(post.image.name))
+        ArchivedPost.objects.filter(pk=post.pk).delete()
+        self.assertFalse(storage.exists(post.image.name))
+
+    def test_untracked_names_are_left_alone(self):
+        release(['posts/legacy.gif'])
+        self.assertFalse(MediaBlob.objects.exists())
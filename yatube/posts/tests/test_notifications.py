@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Notification, NotificationEvent, Post
+from ..notifications import deliver, notify, unread_count
+
+User = get_user_model()
+
+
+class NotificationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.user = User.objects.create_user(username='user')
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Тестовый пост',
+        )
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.authorized_author_client = Client()
+        self.authorized_author_client.force_login(self.author)
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_comments_are_coalesced(self):
+        address = reverse(
+            'posts:add_comment', kwargs={'post_id': self.post.id})
+        for _ in range(5):
+            self.authorized_client.post(address, {'text': 'Комментарий'})
+        self.assertEqual(NotificationEvent.objects.count(), 5)
+        deliver()
+        self.assertFalse(NotificationEvent.objects.exists())
+        notification = Notification.objects.get(recipient=self.author)
+        self.assertEqual(notification.count, 5)
+        self.assertEqual(
+            str(notification), '5 новых комментариев к вашему посту')
+
+    def test_own_comment_is_not_notified(self):
+        self.authorized_author_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}),
+            {'text': 'Комментарий'})
+        self.assertFalse(NotificationEvent.objects.exists())
+
+    def test_unread_count_is_cached_and_reset_by_inbox(self):
+        self.authorized_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author.username}))
+        self.assertEqual(unread_count(self.author), 0)
+        deliver()
+        self.assertEqual(unread_count(self.author), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(unread_count(self.author), 1)
+        response = self.authorized_author_client.get(
+            reverse('posts:notifications'))
+        self.assertContains(response, 'user подписался на вас')
+        self.assertEqual(unread_count(self.author), 0)
+
+    def test_inbox_marks_read_only_shown_page(self):
+        posts = Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {number}')
+            for number in range(settings.NUM_OF_DISPLAYED_POSTS + 1)
+        )
+        for post in Post.objects.filter(text__in=[p.text for p in posts]):
+            notify(self.author, self.user, NotificationEvent.COMMENT, post)
+        deliver()
+        self.authorized_author_client.get(reverse('posts:notifications'))
+        self.assertEqual(
+            Notification.objects.filter(
+                recipient=self.author, is_read=False).count(), 1)
+        self.assertEqual(unread_count(self.author), 1)
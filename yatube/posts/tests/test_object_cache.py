@@ -0,0 +1,157 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from .. import object_cache
+from ..deletion import schedule_posts_deletion
+from ..models import CacheInvalidation, Group, Post
+
+User = get_user_model()
+
+
+class ObjectCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Пост')
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_get_is_read_through(self):
+        object_cache.get(Post, self.post.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(object_cache.get(Post, self.post.pk), self.post)
+
+    def test_natural_key_lookup(self):
+        object_cache.get_or_404(User, username='author')
+        with self.assertNumQueries(0):
+            author = object_cache.get_or_404(User, username='author')
+        self.assertEqual(author, self.author)
+        with self.assertRaises(Http404):
+            object_cache.get_or_404(User, username='nobody')
+
+    def test_get_many_loads_misses_in_one_query(self):
+        other = Post.objects.create(author=self.author, text='Другой')
+        object_cache.get(Post, self.post.pk)
+        with self.assertNumQueries(1):
+            posts = object_cache.get_many(Post, [self.post.pk, other.pk])
+        self.assertEqual(set(posts), {self.post.pk, other.pk})
+
+    def test_save_and_delete_invalidate(self):
+        user = User.objects.create_user(username='old')
+        object_cache.get_or_404(User, username='old')
+        user.username = 'renamed'
+        user.save()
+        with self.assertRaises(Http404):
+            object_cache.get_or_404(User, username='old')
+        self.assertEqual(
+            object_cache.get_or_404(User, username='renamed'), user)
+        post = Post.objects.create(author=self.author, text='Удаляемый')
+        post_id = post.pk
+        object_cache.get(Post, post_id)
+        post.delete()
+        self.assertIsNone(object_cache.get(Post, post_id))
+
+    def test_bulk_update_invalidates(self):
+        self.assertIsNotNone(object_cache.get_visible_post(self.post.pk))
+        schedule_posts_deletion(Post.objects.filter(pk=self.post.pk), 10)
+        self.assertIsNone(object_cache.get_visible_post(self.post.pk))
+
+    def test_inactive_author_hides_post(self):
+        object_cache.get_visible_post(self.post.pk)
+        self.author.is_active = False
+        self.author.save()
+        self.assertIsNone(object_cache.get_visible_post(self.post.pk))
+
+    def test_feed_authors_and_groups_come_from_cache(self):
+        client = Client()
+        url = reverse('posts:group_list', kwargs={'slug': 'group'})
+        client.get(url)
+        response = client.get(url)
+        post = response.context['page_obj'][0]
+        with self.assertNumQueries(0):
+            self.assertEqual(post.author.username, 'author')
+            self.assertEqual(post.group.slug, 'group')
+
+    def test_missing_objects_are_cached_until_created(self):
+        with self.assertRaises(Http404):
+            object_cache.get_or_404(User, username='ghost')
+        object_cache.get(Post, 10 ** 6)
+        with self.assertNumQueries(0):
+            with self.assertRaises(Http404):
+                object_cache.get_or_404(User, username='ghost')
+            self.assertIsNone(object_cache.get(Post, 10 ** 6))
+        User.objects.create_user(username='ghost')
+        self.assertEqual(
+            object_cache.get_or_404(User, username='ghost').username, 'ghost')
+
+    def test_not_found_page_is_served_from_cache(self):
+        client = Client()
+        client.get('/profile/<nobody>/')
+        with self.assertNumQueries(0):
+            response = client.get('/profile/<nobody>/')
+        self.assertEqual(response.status_code, 404)
+        self.assertContains(
+            response, '/profile/&lt;nobody&gt;/', status_code=404)
+
+    def test_user_is_cached_without_account_fields(self):
+        author = object_cache.get(User, self.author.pk)
+        self.assertEqual(author.username, 'author')
+        self.assertIn('password', author.get_deferred_fields())
+        self.assertIn('email', author.get_deferred_fields())
+
+    def test_posts_of_deleted_authors_are_dropped(self):
+        orphan = Post(author_id=10 ** 6, text='Без автора')
+        self.assertEqual(object_cache.attach_related([orphan]), [])
+
+    def test_write_checks_post_in_database(self):
+        client = Client()
+        client.force_login(self.author)
+        object_cache.get_visible_post(self.post.pk)
+        # Пост скрыт в другом процессе: здешний кэш об этом не знает
+        Post.objects.filter(pk=self.post.pk).update(pending_delete=True)
+        response = client.post(
+            reverse('posts:like_toggle', args=[self.post.pk]))
+        self.assertEqual(response.status_code, 404)
+        response = client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(self.post.comments.exists())
+
+    @override_settings(OBJECT_CACHE_CHECK_INTERVAL=0)
+    def test_keys_dropped_by_other_processes_are_forgotten(self):
+        # Журнал читается с текущей записи, как в новом процессе
+        object_cache.invalidations._checked = None
+        object_cache.invalidations.check()
+        self.assertEqual(
+            object_cache.get(User, self.author.pk).first_name, '')
+        with self.assertRaises(Http404):
+            object_cache.get_or_404(User, username='newcomer')
+        # Другой процесс правит строки без сигналов в этом процессе и
+        # записывает сброшенные ключи в журнал
+        User.objects.filter(pk=self.author.pk).update(first_name='Лев')
+        User.objects.bulk_create([User(username='newcomer')])
+        CacheInvalidation.objects.bulk_create([
+            CacheInvalidation(
+                key=object_cache.object_key(User, self.author.pk)),
+            CacheInvalidation(
+                key=object_cache.natural_key(User, 'newcomer')),
+        ])
+        self.assertEqual(
+            object_cache.get(User, self.author.pk).first_name, 'Лев')
+        self.assertEqual(
+            object_cache.get_or_404(User, username='newcomer').username,
+            'newcomer')
+
+    def test_invalidation_is_recorded_for_other_processes(self):
+        object_cache.invalidate(Post, [self.post.pk])
+        self.assertTrue(CacheInvalidation.objects.filter(
+            key=object_cache.object_key(Post, self.post.pk)).exists())
@@ -0,0 +1,100 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail import get_thumbnail
+
+from ..models import MediaBlob, Post
+from ..orphans import find_orphans, iter_files
+from ..storage import storage
+from .test_media import OTHER_GIF, SMALL_GIF, upload
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, MEDIA_PIN_TIMEOUT=0)
+class OrphansTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def collect(self, **options):
+        out = StringIO()
+        call_command('collect_orphaned_media', min_age=0, pause=0,
+                     stdout=out, **options)
+        return out.getvalue()
+
+    def test_iter_files_is_sorted(self):
+        for name in ('posts/b.jpg', 'posts/a/c.jpg', 'posts/a.jpg'):
+            storage.save(name, ContentFile(name.encode()))
+        names = list(iter_files(storage, 'posts'))
+        self.assertEqual(names, sorted(names))
+        self.assertEqual(len(names), 3)
+
+    def test_large_directory_is_sorted_in_chunks(self):
+        names = [
+            storage.save(name, ContentFile(name.encode()))
+            for name in [f'posts/{i}.jpg' for i in range(10)]
+        ]
+        self.assertEqual(
+            list(iter_files(storage, 'posts', chunk_size=3)), sorted(names))
+
+    def test_find_orphans(self):
+        self.assertEqual(
+            list(find_orphans(['a', 'b', 'c', 'd'], ['b', 'd', 'e'])),
+            ['a', 'c'])
+
+    def test_deletes_only_unreferenced_images(self):
+        kept = Post.objects.create(
+            author=self.author, text='Пост', image=upload()).image.name
+        orphan = Post.objects.create(
+            author=self.author, text='Пост', image=upload(OTHER_GIF))
+        orphan_name = orphan.image.name
+        # Пост исчез без сигналов, и файл остался без ссылок
+        Post.objects.filter(pk=orphan.pk).update(image='')
+        legacy = storage._save('posts/legacy.gif', ContentFile(SMALL_GIF))
+
+        self.collect(dry_run=True)
+        self.assertTrue(storage.exists(orphan_name))
+
+        self.collect()
+        self.assertTrue(storage.exists(kept))
+        self.assertFalse(storage.exists(orphan_name))
+        self.assertFalse(storage.exists(legacy))
+        self.assertFalse(MediaBlob.objects.filter(name=orphan_name).exists())
+
+    def test_pinned_files_are_kept(self):
+        with self.settings(MEDIA_PIN_TIMEOUT=60):
+            name = storage.save('posts/pinned.gif', upload())
+        self.collect()
+        self.assertTrue(storage.exists(name))
+
+    def test_fresh_files_are_kept(self):
+        name = storage._save('posts/fresh.gif', ContentFile(SMALL_GIF))
+        call_command('collect_orphaned_media', pause=0, stdout=StringIO())
+        self.assertTrue(storage.exists(name))
+
+    def test_deletes_stale_thumbnails(self):
+        post = Post.objects.create(
+            author=self.author, text='Пост', image=upload())
+        thumbnail = get_thumbnail(post.image, '10x10').name
+        stale = storage._save('cache/ab/cd/stale.jpg', ContentFile(b'x'))
+        self.collect()
+        self.assertTrue(storage.exists(thumbnail))
+        self.assertFalse(storage.exists(stale))
@@ -0,0 +1,108 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from ..models import Post
+from ..paginators import EstimatedPaginator
+
+User = get_user_model()
+
+
+@override_settings(EXACT_COUNT_THRESHOLD=5, NUM_OF_DISPLAYED_POSTS=2)
+class EstimatedPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Пост {i}') for i in range(8))
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_small_results_are_exact(self):
+        paginator = EstimatedPaginator(Post.objects.all()[:4], 2)
+        self.assertEqual(paginator.count, 4)
+        self.assertFalse(paginator.is_estimated)
+
+    def test_large_results_are_cached_estimates(self):
+        paginator = EstimatedPaginator(Post.objects.all(), 2)
+        self.assertEqual(paginator.count, 8)
+        self.assertTrue(paginator.is_estimated)
+        Post.objects.create(author=self.author, text='Ещё пост')
+        with self.assertNumQueries(1):
+            paginator = EstimatedPaginator(Post.objects.all(), 2)
+            self.assertEqual(paginator.count, 8)
+
+    def test_table_estimate_uses_sqlite_statistics(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        Post.objects.create(author=self.author, text='После ANALYZE')
+        paginator = EstimatedPaginator(
+            Post.objects.all(), 2, table_estimate=True)
+        self.assertEqual(paginator.count, 8)
+        self.assertTrue(paginator.is_estimated)
+
+    def test_count_display(self):
+        paginator = EstimatedPaginator([], 10)
+        paginator.count = 1234567
+        self.assertEqual(paginator.count_display, '1,2 млн')
+
+    def test_stale_statistics_are_not_below_threshold(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            cursor.execute(
+                "UPDATE sqlite_stat1 SET stat = '1 1' WHERE tbl = %s",
+                [Post._meta.db_table])
+        paginator = EstimatedPaginator(
+            Post.objects.all(), 2, table_estimate=True)
+        self.assertEqual(paginator.count, 6)
+
+    def test_feed_shows_estimate(self):
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, 'Около 8 записей')
+        self.assertEqual(
+            list(response.context['page_obj'].page_window), [1, 2, 3, 4])
+
+    def test_pages_past_stale_estimate_are_reachable(self):
+        call_command('analyze_db', stdout=StringIO())
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Новый {i}') for i in range(3))
+        client = Client()
+        response = client.get(reverse('posts:index'), {'page': 4})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.number, 4)
+        self.assertTrue(page_obj.has_next())
+        # 11 постов: последняя страница - шестая, с одним постом
+        response = client.get(reverse('posts:index'), {'page': 6})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.number, 6)
+        self.assertEqual(len(page_obj.object_list), 1)
+        self.assertFalse(page_obj.has_next())
+        response = client.get(reverse('posts:index'), {'page': 7})
+        self.assertEqual(response.context['page_obj'].number, 6)
+
+    def test_pages_before_too_high_estimate_are_checked(self):
+        posts = Post.objects.order_by('id')
+        paginator = EstimatedPaginator(posts, 2, estimate=(30, True))
+        page = paginator.get_page(3)
+        self.assertEqual(len(page.object_list), 2)
+        self.assertTrue(page.has_next())
+        # Страница пуста: число строк пересчитано, отдана последняя
+        page = paginator.get_page(10)
+        self.assertEqual(page.number, 4)
+        self.assertFalse(page.has_next())
+        self.assertEqual(paginator.count, 8)
+        self.assertFalse(paginator.is_estimated)
+
+    def test_last_page_under_too_high_estimate_has_no_next(self):
+        paginator = EstimatedPaginator(
+            Post.objects.order_by('id'), 3, estimate=(30, True))
+        page = paginator.get_page(3)
+        self.assertEqual(len(page.object_list), 2)
+        self.assertFalse(page.has_next())
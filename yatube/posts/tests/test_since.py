@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..blocks import set_block
+from ..models import Block, Follow, Group, Post
+
+User = get_user_model()
+
+
+class PostsSinceTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='group_slug',
+        )
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Старый пост',
+        )
+
+    def setUp(self) -> None:
+        self.guest_client = Client()
+
+    def test_watermark_without_params(self):
+        response = self.guest_client.get(reverse('posts:index_since'))
+        data = response.json()
+        self.assertEqual(data['count'], 0)
+        self.assertEqual(data['watermark']['id'], self.old_post.id)
+
+    def test_new_posts_since_watermark(self):
+        watermark = self.guest_client.get(
+            reverse('posts:index_since')).json()['watermark']
+        new_post = Post.objects.create(
+            author=self.author, text='Новый пост', group=self.group)
+        for address in (
+            reverse('posts:index_since'),
+            reverse('posts:group_list_since',
+                    kwargs={'slug': self.group.slug}),
+            reverse('posts:profile_since',
+                    kwargs={'username': self.author.username}),
+        ):
+            with self.subTest(address=address):
+                data = self.guest_client.get(address, watermark).json()
+                self.assertEqual(data['count'], 1)
+                self.assertEqual(data['ids'], [new_post.id])
+                self.assertEqual(data['watermark']['id'], new_post.id)
+
+    def test_invalid_watermark(self):
+        response = self.guest_client.get(
+            reverse('posts:index_since'), {'pub_date': 'вчера', 'id': 1})
+        self.assertEqual(response.status_code, 400)
+
+    def test_muted_authors_are_not_counted(self):
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author)
+        client = Client()
+        client.force_login(reader)
+        watermark = client.get(
+            reverse('posts:index_since')).json()['watermark']
+        Post.objects.create(
+            author=self.author, text='Новый пост', group=self.group)
+        set_block(reader, self.author, Block.MUTE)
+        for address in (
+            reverse('posts:index_since'),
+            reverse('posts:group_list_since',
+                    kwargs={'slug': self.group.slug}),
+            reverse('posts:profile_since',
+                    kwargs={'username': self.author.username}),
+            reverse('posts:follow_index_since'),
+        ):
+            with self.subTest(address=address):
+                data = client.get(address, watermark).json()
+                self.assertEqual(data['count'], 0)
+                self.assertEqual(data['ids'], [])
@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Mention, Notification, NotificationEvent, Post, Tag
+from ..notifications import deliver
+
+User = get_user_model()
+
+
+class TagIndexTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_save_indexes_tags_and_mentions(self):
+        post = Post.objects.create(
+            author=self.author, text='#Новости и #спорт для @reader')
+        self.assertEqual(
+            set(post.post_tags.values_list('tag__name', flat=True)),
+            {'новости', 'спорт'})
+        self.assertTrue(
+            Mention.objects.filter(post=post, user=self.reader).exists())
+        post.text = '#спорт'
+        post.save()
+        self.assertEqual(
+            list(post.post_tags.values_list('tag__name', flat=True)),
+            ['спорт'])
+        self.assertFalse(post.mentions.exists())
+
+    def test_mention_notifies_once(self):
+        post = Post.objects.create(author=self.author, text='Привет, @reader')
+        post.save()
+        deliver()
+        notification = Notification.objects.get(recipient=self.reader)
+        self.assertEqual(notification.kind, NotificationEvent.MENTION)
+        self.assertEqual(notification.count, 1)
+
+    def test_tag_feed(self):
+        tagged = Post.objects.create(author=self.author, text='Про #Спорт')
+        Post.objects.create(author=self.author, text='Без тегов')
+        response = Client().get(
+            reverse('posts:tag_posts', kwargs={'tag': 'СПОРТ'}))
+        self.assertEqual(list(response.context['page_obj']), [tagged])
+        self.assertEqual(response.context['tag'], Tag.objects.get())
+        self.assertContains(
+            response, reverse('posts:tag_posts', kwargs={'tag': 'спорт'}))
+        response = Client().get(
+            reverse('posts:tag_posts', kwargs={'tag': 'нет'}))
+        self.assertEqual(response.status_code, 404)
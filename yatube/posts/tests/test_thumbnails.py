@@ -0,0 +1,144 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import default
+
+from ..models import Post
+from ..media import delete_file
+from ..object_cache import invalidations
+from .. import thumbnails
+from ..thumbnails import Picture, get_picture, get_pictures, variant_formats
+from .test_images import make_upload
+from .test_media import upload
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', image=upload())
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def render(self, template, post, **context):
+        return Template('{% load pictures %}' + template).render(
+            Context({'post': post, **context}))
+
+    def test_picture_has_every_width(self):
+        picture = get_picture(self.post.image)
+        for width in settings.IMAGE_VARIANT_WIDTHS:
+            self.assertIn(f' {width}w', picture.srcset)
+        self.assertEqual((picture.width, picture.height), (960, 339))
+        self.assertTrue(picture.src.endswith('.jpg'))
+
+    def test_tag_renders_lazy_picture(self):
+        html = self.render('{% picture post.image %}', self.post)
+        self.assertIn('<picture>', html)
+        self.assertIn('srcset=', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertIn('width="960" height="339"', html)
+        html = self.render('{% picture post.image lazy=False %}', self.post)
+        self.assertNotIn('loading="lazy"', html)
+
+    def test_post_without_image(self):
+        post = Post.objects.create(author=self.author, text='Без картинки')
+        self.assertIsNone(get_picture(post.image))
+        self.assertNotIn('<picture>', self.render(
+            '{% picture post.image %}', post))
+
+    @override_settings(IMAGE_VARIANT_FORMATS=('AVIF', 'PNG'))
+    def test_unsupported_formats_are_skipped(self):
+        self.assertEqual(variant_formats(), ['PNG'])
+        picture = get_picture(self.post.image)
+        self.assertEqual(
+            [content_type for content_type, _ in picture.sources],
+            ['image/png'])
+
+    def test_pictures_come_from_one_cache_lookup(self):
+        other = Post.objects.create(
+            author=self.author, text='Пост', image=make_upload((20, 10)))
+        images = [self.post.image, other.image]
+        first = get_pictures(images)
+        self.assertEqual(set(first), {image.name for image in images})
+        with mock.patch.object(
+                thumbnails, 'get_thumbnail') as get_thumbnail, \
+                mock.patch.object(
+                    thumbnails.cache, 'get_many',
+                    wraps=thumbnails.cache.get_many) as get_many:
+            second = get_pictures(images)
+        get_thumbnail.assert_not_called()
+        self.assertEqual(get_many.call_count, 1)
+        self.assertEqual(second[other.image.name].src,
+                         first[other.image.name].src)
+
+    def test_tag_uses_pictures_from_context(self):
+        picture = Picture([], '/media/x.jpg', '/media/x.jpg 960w', 960, 339)
+        html = self.render('{% picture post.image %}', self.post,
+                           pictures={self.post.image.name: picture})
+        self.assertIn('src="/media/x.jpg"', html)
+
+    def test_feed_pages_resolve_pictures(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertIn(self.post.image.name, response.context['pictures'])
+
+    def test_deleted_file_is_forgotten(self):
+        other = Post.objects.create(
+            author=self.author, text='Пост', image=make_upload((20, 10)))
+        get_pictures([other.image])
+        delete_file(other.image.name)
+        with mock.patch.object(
+                thumbnails, 'get_picture', return_value=None) as get_picture:
+            get_pictures([other.image])
+        get_picture.assert_called_once()
+
+    @override_settings(OBJECT_CACHE_CHECK_INTERVAL=0)
+    def test_file_deleted_in_other_process_is_forgotten(self):
+        other = Post.objects.create(
+            author=self.author, text='Пост', image=make_upload((20, 10)))
+        name = other.image.name
+        # Журнал читается с текущей записи, как в новом процессе
+        invalidations._checked = None
+        picture = get_pictures([other.image])[name]
+        delete_file(name)
+        # Кэш другого процесса запись ещё помнит
+        cache.set(thumbnails._key(name), picture)
+        with mock.patch.object(
+                thumbnails, 'get_picture', return_value=None) as get_picture:
+            get_pictures([other.image])
+        get_picture.assert_called_once()
+
+    def test_cached_pictures_do_not_touch_storage(self):
+        get_pictures([self.post.image])
+        with mock.patch.object(default.storage, 'exists') as exists:
+            get_pictures([self.post.image])
+        exists.assert_not_called()
+
+    def test_failures_are_cached(self):
+        with mock.patch.object(
+                thumbnails, 'get_picture', return_value=None) as get_picture:
+            self.assertEqual(
+                get_pictures([self.post.image]), {self.post.image.name: None})
+            html = self.render('{% picture post.image %}', self.post,
+                               pictures=get_pictures([self.post.image]))
+        get_picture.assert_called_once()
+        self.assertNotIn('<picture>', html)
@@ -0,0 +1,172 @@
+"""Адаптивные миниатюры картинок постов.
+
+Для каждой картинки sorl-thumbnail готовит миниатюры нескольких ширин
+в JPEG и в более экономных форматах из IMAGE_VARIANT_FORMATS, если их
+умеет записывать Pillow. Шаблон выводит их через <picture> и srcset,
+и браузер скачивает самый лёгкий подходящий вариант.
+
+Готовые Picture лежат в кэше под именем картинки: имена картинок
+постов зависят от содержимого (см. posts.storage), поэтому запись
+устаревает, только если файл удалён. Удаление сбрасывает её и ключи
+sorl через журнал сброшенных ключей кэша объектов, и другие процессы
+забывают их не позже чем через OBJECT_CACHE_CHECK_INTERVAL секунд;
+хранилище при выдаче из кэша не проверяется. Неудачи тоже кэшируются,
+на NEGATIVE_CACHE_TIMEOUT. Страница ленты получает миниатюры всех
+своих картинок одним get_many.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import EXTENSIONS
+from sorl.thumbnail.kvstores.base import add_prefix
+
+from .object_cache import invalidations
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_FORMAT = 'JPEG'
+# Ширина картинки на странице: колонка ленты или весь экран телефона
+SIZES = '(min-width: 992px) 960px, 100vw'
+# Метка картинки, для которой миниатюры получить не удалось
+MISSING = 'missing'
+
+
+class Picture:
+    def __init__(self, sources, src, srcset, width, height):
+        # sources - пары (MIME-тип, srcset) для тегов <source>
+        self.sources = sources
+        self.src = src
+        self.srcset = srcset
+        self.width = width
+        self.height = height
+        self.sizes = SIZES
+
+
+def variant_formats():
+    """Дополнительные форматы, которые умеют и sorl, и Pillow."""
+    Image.init()
+    return [
+        image_format for image_format in settings.IMAGE_VARIANT_FORMATS
+        if image_format in EXTENSIONS and image_format in Image.SAVE
+    ]
+
+
+def variant_sizes():
+    """Размеры миниатюр (ширина, высота) по возрастанию ширины."""
+    ratio_width, ratio_height = settings.IMAGE_VARIANT_RATIO
+    return [
+        (width, round(width * ratio_height / ratio_width))
+        for width in sorted(settings.IMAGE_VARIANT_WIDTHS)
+    ]
+
+
+def get_pictures(images):
+    """{имя картинки: Picture или None} для картинок страницы.
+
+    Кэш спрашивается одним запросом на все картинки, миниатюры
+    готовятся только для тех, которых в нём нет. None - миниатюры
+    получить не удалось.
+    """
+    images = {image.name: image for image in images if image}
+    keys = {_key(name): name for name in images}
+    invalidations.check()
+    cached = cache.get_many(list(keys))
+    pictures = {}
+    found = {}
+    failed = {}
+    for key, name in keys.items():
+        picture = cached.get(key)
+        if picture == MISSING:
+            pictures[name] = None
+            continue
+        if picture is None:
+            picture = get_picture(images[name])
+            if picture is None:
+                failed[key] = MISSING
+            else:
+                found[key] = picture
+        pictures[name] = picture
+    if found:
+        cache.set_many(found, settings.PICTURE_CACHE_TIMEOUT)
+    if failed:
+        cache.set_many(failed, settings.NEGATIVE_CACHE_TIMEOUT)
+    return pictures
+
+
+def forget_picture(image):
+    """Убирает из кэша всех процессов миниатюры удаляемой картинки.
+
+    image - ImageFile исходника. Вызывается до удаления: ключи
+    миниатюр читаются из хранилища ключей sorl. Кэш sorl сам себя не
+    перепроверяет, поэтому сбрасываются и его ключи.
+    """
+    thumbnails = default.kvstore._get(image.key, identity='thumbnails')
+    keys = [
+        _key(image.name),
+        add_prefix(image.key),
+        add_prefix(image.key, identity='thumbnails'),
+    ]
+    keys += [add_prefix(key) for key in thumbnails or ()]
+    cache.delete_many(keys)
+    invalidations.record(keys)
+
+
+def get_picture(image):
+    """Picture для картинки поста или None, если картинки нет.
+
+    Каждая миниатюра - отдельное обращение к хранилищу ключей sorl,
+    поэтому шаблоны берут Picture через get_pictures.
+    """
+    if not image:
+        return None
+    sizes = variant_sizes()
+    try:
+        srcsets = {
+            image_format: [
+                (get_thumbnail(
+                    image, f'{width}x{height}',
+                    crop='center',
+                    upscale=True,
+                    format=image_format,
+                    quality=settings.IMAGE_VARIANT_QUALITY,
+                ), width)
+                for width, height in sizes
+            ]
+            for image_format in variant_formats() + [FALLBACK_FORMAT]
+        }
+    except Exception:
+        # Как и тег thumbnail: битая картинка не должна ронять страницу
+        logger.exception('Не удалось получить миниатюры %s', image)
+        return None
+    fallback = srcsets.pop(FALLBACK_FORMAT)
+    width, height = sizes[-1]
+    src = fallback[-1][0]
+    return Picture(
+        sources=[
+            (f'image/{image_format.lower()}', _srcset(thumbnails))
+            for image_format, thumbnails in srcsets.items()
+        ],
+        src=src.url,
+        srcset=_srcset(fallback),
+        width=width,
+        height=height,
+    )
+
+
+def _key(name):
+    # Смена настроек вариантов меняет ключи, и старые записи
+    # не попадаются
+    signature = repr((
+        name, settings.IMAGE_VARIANT_WIDTHS, settings.IMAGE_VARIANT_RATIO,
+        settings.IMAGE_VARIANT_QUALITY, variant_formats(),
+    ))
+    return 'picture:' + hashlib.md5(signature.encode()).hexdigest()
+
+
+def _srcset(thumbnails):
+    return ', '.join(
+        f'{thumbnail.url} {width}w' for thumbnail, width in thumbnails)
@@ -0,0 +1,35 @@
+"""Обработчик загрузок с пределом размера.
+
+Размер картинки проверяется, пока запрос ещё читается: файл больше
+IMAGE_MAX_UPLOAD_SIZE обрывается на первом лишнем куске и не пишется
+на диск целиком. Остаток запроса вычитывается без записи, а форма
+узнаёт об обрыве через check_upload.
+"""
+from django.conf import settings
+from django.core.files.uploadhandler import (
+    StopUpload, TemporaryFileUploadHandler
+)
+from django.template.defaultfilters import filesizeformat
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > settings.IMAGE_MAX_UPLOAD_SIZE:
+            self.request.upload_too_large = self.field_name
+            raise StopUpload(connection_reset=False)
+        super().receive_data_chunk(raw_data, start)
+
+
+def check_upload(request, form):
+    """Добавляет форме ошибку, если загрузка была оборвана.
+
+    Поля, шедшие в запросе после оборванного файла, до формы не доходят,
+    поэтому сохранять её в этом случае нельзя.
+    """
+    field = getattr(request, 'upload_too_large', None)
+    if field is None:
+        return
+    if field not in form.fields:
+        field = None
+    form.add_error(field, 'Файл больше %s' % filesizeformat(
+        settings.IMAGE_MAX_UPLOAD_SIZE))
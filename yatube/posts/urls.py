@@ -6,21 +6,86 @@ app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('events/', views.index_events, name='index_events'),
+    path('since/', views.index_since, name='index_since'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path(
+        'group/<slug:slug>/since/',
+        views.group_posts_since,
+        name='group_list_since'
+    ),
+    path(
+        'group/<slug:slug>/follow/', views.group_follow, name='group_follow'),
+    path(
+        'group/<slug:slug>/unfollow/',
+        views.group_unfollow,
+        name='group_unfollow'
+    ),
+    path('tags/<str:tag>/', views.tag_posts, name='tag_posts'),
     # Профайл пользователя
     path('profile/<str:username>/', views.profile, name='profile'),
+    path(
+        'profile/<str:username>/since/',
+        views.profile_since,
+        name='profile_since'
+    ),
+    path(
+        'profile/<str:username>/followers/',
+        views.profile_followers,
+        name='followers'
+    ),
+    path(
+        'profile/<str:username>/followers/json/',
+        views.profile_followers_json,
+        name='followers_json'
+    ),
+    path(
+        'profile/<str:username>/following/',
+        views.profile_following,
+        name='following'
+    ),
+    path(
+        'profile/<str:username>/following/json/',
+        views.profile_following_json,
+        name='following_json'
+    ),
     # Просмотр записи
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path(
         'posts/<int:post_id>/comment/', views.add_comment, name='add_comment'),
+    path('posts/<int:post_id>/like/', views.like_toggle, name='like_toggle'),
+    path('notifications/', views.notifications, name='notifications'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/events/', views.follow_events, name='follow_events'),
+    path(
+        'follow/since/', views.follow_index_since, name='follow_index_since'),
+    path(
+        'posts/<int:post_id>/events/',
+        views.comment_events,
+        name='comment_events'
+    ),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
         name='profile_follow'
     ),
+    path(
+        'profile/<str:username>/block/',
+        views.profile_block,
+        name='profile_block'
+    ),
+    path(
+        'profile/<str:username>/mute/',
+        views.profile_mute,
+        name='profile_mute'
+    ),
+    path(
+        'profile/<str:username>/unblock/',
+        views.profile_unblock,
+        name='profile_unblock'
+    ),
     path(
         'profile/<str:username>/unfollow/',
         views.profile_unfollow,
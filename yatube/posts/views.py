@@ -1,54 +1,129 @@
-from django.core.paginator import Paginator
+import json
+import time
+
+from django.db.models import Max, Q
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.shortcuts import render, get_object_or_404, redirect
+from django.utils.http import is_safe_url
+from django.views.decorators.http import require_POST
 from django.conf import settings
-from .models import Post, Group, User, Follow
+from . import blocks
+from .blocks import exclude_authors, excluded_authors, feed_suffix
+from .follows import followers_page, following_page
+from .markup import normalize_tag
+from .models import (
+    ArchivedPost, Block, Comment, Post, PostTag, Tag, User, Follow,
+    GroupFollow, NotificationEvent
+)
+from . import feeds, object_cache
+from .groups import registry as groups
+from .archive import ChainedPosts, get_archived_post
 from django.contrib.auth.decorators import login_required
 from .forms import PostForm, CommentForm
-from django.views.decorators.cache import cache_page
+from django.db.models import Sum
+from .broker import (
+    author_channel, broker, comments_channel, group_channel, index_channel
+)
+from .counters import post_views
+from .likes import annotate_likes, toggle_like
+from .notifications import mark_read, notify
+from .paginators import EstimatedPaginator
+from .thumbnails import get_pictures
+from .uploads import check_upload
 
 
-@cache_page(20, key_prefix='index_page')
 def index(request):
     template = 'posts/index.html'
-    posts = Post.objects.all().order_by('-pub_date')
-    paginator = Paginator(posts, settings.NUM_OF_DISPLAYED_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = exclude_authors(Post.objects.visible(), request.user)
+    # Почти все посты видимы - оценки по статистике таблицы достаточно
+    page_obj = feeds.get_page(
+        feeds.INDEX_FEED, posts, request.GET.get('page'),
+        table_estimate=True, variant=feed_suffix(request.user))
+    # Лайки зависят от пользователя, поэтому в кэш ленты не входят
+    annotate_likes(page_obj.object_list, request.user)
     context = {
         'page_obj': page_obj,
+        'pictures': _page_pictures(page_obj),
     }
     return render(request, template, context)
 
 
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = groups.get_by_slug(slug)
+    if group is None:
+        raise Http404('Группа не найдена')
     template = 'posts/group_list.html'
-    posts = (Post.objects.filter(group=group).
-             order_by('-pub_date'))
-    paginator = Paginator(posts, settings.NUM_OF_DISPLAYED_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    posts = exclude_authors(
+        Post.objects.visible().filter(group=group), request.user)
+    page_obj = feeds.get_page(
+        feeds.group_feed(group.pk), posts, request.GET.get('page'),
+        variant=feed_suffix(request.user))
+    annotate_likes(page_obj.object_list, request.user)
+    following = request.user.is_authenticated and GroupFollow.objects.filter(
+        user=request.user, group=group).exists()
     context = {
         'group': group,
         'page_obj': page_obj,
+        'pictures': _page_pictures(page_obj),
+        'following': following,
     }
     return render(request, template, context)
 
 
+def tag_posts(request, tag):
+    tag = get_object_or_404(Tag, name=normalize_tag(tag))
+    # Лента тега читается диапазоном индекса (tag, pub_date) таблицы
+    # PostTag, а посты собираются из кэша
+    entries = PostTag.objects.filter(
+        tag=tag, post__pending_delete=False, post__author__is_active=True,
+    ).order_by('-pub_date', '-post_id')
+    entries = exclude_authors(entries, request.user, 'post__author')
+    page_obj = feeds.get_page(
+        feeds.tag_feed(tag.pk), entries, request.GET.get('page'),
+        id_field='post_id', variant=feed_suffix(request.user))
+    annotate_likes(page_obj.object_list, request.user)
+    context = {
+        'tag': tag,
+        'page_obj': page_obj,
+        'pictures': _page_pictures(page_obj),
+    }
+    return render(request, 'posts/tag_list.html', context)
+
+
 def profile(request, username):
     # Здесь код запроса к модели и создание словаря контекста
-    author = get_object_or_404(User, username=username)
-    posts = (Post.objects.filter(author=author).
-             order_by('-pub_date'))
-    paginator = Paginator(posts, settings.NUM_OF_DISPLAYED_POSTS)
+    author = object_cache.get_or_404(User, username=username)
+    posts = Post.objects.visible().filter(author=author)
+    archived = ArchivedPost.objects.filter(
+        author=author, author__is_active=True)
+    # Архивные посты идут в профиле сразу за свежими; как и в лентах,
+    # выводится только начало текста
+    entries = ChainedPosts(
+        posts.defer(*Post.FULL_TEXT_FIELDS),
+        archived.defer(*ArchivedPost.FULL_TEXT_FIELDS))
+    paginator = EstimatedPaginator(
+        entries, settings.NUM_OF_DISPLAYED_POSTS)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
-    post_num = posts.count()
+    page_obj.object_list = annotate_likes(
+        object_cache.attach_related(list(page_obj.object_list)),
+        request.user)
+    views_total = sum(
+        queryset.aggregate(views=Sum('views'))['views'] or 0
+        for queryset in (posts, archived)
+    )
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user, author=author).exists()
+    block = request.user.is_authenticated and Block.objects.filter(
+        user=request.user, target=author).first()
     context = {
-        'post_num': post_num,
+        'block': block,
+        'post_num': paginator.count,
+        'views_total': views_total,
         'page_obj': page_obj,
+        'pictures': _page_pictures(page_obj),
         'author': author,
         'following': following
     }
@@ -57,14 +132,30 @@ def profile(request, username):
 
 def post_detail(request, post_id):
     # Здесь код запроса к модели и создание словаря контекста
-    post = get_object_or_404(Post, id=post_id)
+    post = object_cache.get_visible_post(post_id)
+    if post is None:
+        # Поста нет среди свежих - ищем его в архиве
+        post = get_archived_post(post_id)
+        if post is None:
+            raise Http404('Пост не найден')
+        views = post.views
+    else:
+        if settings.POST_VIEWS_ENABLED:
+            post_views.increment(post.pk)
+        views = post.views + post_views.pending(post.pk)
+        annotate_likes([post], request.user)
     author = post.author
-    post_num = (Post.objects.filter(author=author).count())
-    comments = post.comments.all()
+    post_num = (Post.objects.visible().filter(author=author).count()
+                + author.archived_posts.count())
+    comments = exclude_authors(
+        post.comments.filter(author__is_active=True), request.user,
+    ).select_related('author')
     comment_form = CommentForm(request.POST or None)
     context = {
         'post_num': post_num,
         'post': post,
+        'pictures': get_pictures([post.image]),
+        'views': views,
         'comments': comments,
         'form': comment_form
     }
@@ -73,8 +164,9 @@ def post_detail(request, post_id):
 
 @login_required
 def post_create(request):
-    form = PostForm(request.POST)
+    form = PostForm(request.POST, files=request.FILES or None)
     if request.method == 'POST':
+        check_upload(request, form)
         if form.is_valid():
             user = request.user
             form.instance.author = user
@@ -87,7 +179,9 @@ def post_create(request):
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    # Пост читаем из базы, а не из кэша: форма сохраняет его целиком,
+    # и устаревшие views или pending_delete затёрли бы свежие значения
+    post = get_object_or_404(Post.objects.visible(), id=post_id)
     user = post.author
     if user == request.user:
         if request.method == 'POST':
@@ -95,6 +189,7 @@ def post_edit(request, post_id):
                 request.POST,
                 files=request.FILES or None,
                 instance=post)
+            check_upload(request, form)
             if form.is_valid():
                 form.save()
                 return redirect('posts:post_detail', post_id)
@@ -106,49 +201,434 @@ def post_edit(request, post_id):
     return redirect('posts:post_detail', post_id)
 
 
+def _post_for_write(post_id):
+    """Видимый пост, к которому пишется комментарий или лайк.
+
+    Кэш объектов у каждого процесса свой, и пост, скрытый или удалённый
+    в другом процессе, может ещё лежать в нём, поэтому перед записью
+    видимость поста проверяется по базе.
+    """
+    post = object_cache.get_visible_post(post_id)
+    if post is None or not Post.objects.visible().filter(
+            pk=post_id).exists():
+        raise Http404('Пост не найден')
+    return post
+
+
 @login_required
 def add_comment(request, post_id):
-    # Получите пост и сохраните его в переменную post.
-    post = get_object_or_404(Post, id=post_id)
+    post = _post_for_write(post_id)
     form = CommentForm(request.POST or None)
+    if blocks.is_blocked(post.author, request.user):
+        # Автор заблокировал комментатора
+        return redirect('posts:post_detail', post_id=post_id)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
         comment.save()
+        notify(post.author, request.user, NotificationEvent.COMMENT, post)
+    return redirect('posts:post_detail', post_id=post_id)
+
+
+@login_required
+@require_POST
+def like_toggle(request, post_id):
+    post = _post_for_write(post_id)
+    toggle_like(request.user, post)
+    next_url = request.POST.get('next')
+    if next_url and is_safe_url(next_url, {request.get_host()}):
+        return redirect(next_url)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, settings.NUM_OF_DISPLAYED_POSTS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Посты авторов и посты групп - два отдельных источника, которые
+    # сливаются по дате публикации
+    sources = [
+        exclude_authors(posts, request.user)
+        for posts in _followed_posts(request.user)
+    ]
+    limit = settings.FOLLOW_FEED_MAX_PAGES * settings.NUM_OF_DISPLAYED_POSTS
+    page_obj = feeds.get_page(
+        feeds.follow_feed(request.user.pk),
+        feeds.MergedFeed(*sources, limit=limit),
+        request.GET.get('page'), variant=feed_suffix(request.user))
+    annotate_likes(page_obj.object_list, request.user)
     context = {
         'page_obj': page_obj,
+        'pictures': _page_pictures(page_obj),
     }
     return render(request, 'posts/follow.html', context)
 
 
+def _page_pictures(page_obj):
+    # Миниатюры всех картинок страницы - одним запросом к кэшу
+    return get_pictures(post.image for post in page_obj.object_list)
+
+
+def _followed_posts(user):
+    """Выборки постов подписок: по авторам и по группам."""
+    authors = Follow.objects.filter(user=user).values('author')
+    followed_groups = GroupFollow.objects.filter(user=user).values('group')
+    return (
+        Post.objects.visible().filter(author__in=authors),
+        Post.objects.visible().filter(group__in=followed_groups),
+    )
+
+
 @login_required
 def profile_follow(request, username):
     # Подписаться на автора
-    author = get_object_or_404(User, username=username)
+    author = object_cache.get_or_404(User, username=username)
     user = request.user
-    if author != user:
+    if author != user and not blocks.is_blocked(author, user):
         if not Follow.objects.filter(user=user, author=author).exists():
             Follow.objects.create(
                 user=user,
                 author=author
             )
+            notify(author, user, NotificationEvent.FOLLOW)
     return redirect('posts:follow_index')
 
 
+@login_required
+@require_POST
+def group_follow(request, slug):
+    group = groups.get_by_slug(slug)
+    if group is None:
+        raise Http404('Группа не найдена')
+    GroupFollow.objects.get_or_create(user=request.user, group=group)
+    return redirect('posts:group_list', slug)
+
+
+@login_required
+@require_POST
+def group_unfollow(request, slug):
+    group = groups.get_by_slug(slug)
+    if group is None:
+        raise Http404('Группа не найдена')
+    GroupFollow.objects.filter(user=request.user, group=group).delete()
+    return redirect('posts:group_list', slug)
+
+
+@login_required
+@require_POST
+def profile_block(request, username):
+    return _set_block(request, username, Block.BLOCK)
+
+
+@login_required
+@require_POST
+def profile_mute(request, username):
+    return _set_block(request, username, Block.MUTE)
+
+
+@login_required
+@require_POST
+def profile_unblock(request, username):
+    target = object_cache.get_or_404(User, username=username)
+    blocks.remove_block(request.user, target)
+    return redirect('posts:profile', username)
+
+
+def _set_block(request, username, kind):
+    target = object_cache.get_or_404(User, username=username)
+    if target != request.user:
+        blocks.set_block(request.user, target, kind)
+    return redirect('posts:profile', username)
+
+
 @login_required
 def profile_unfollow(request, username):
     # Дизлайк, отписка
-    author = get_object_or_404(User, username=username)
+    author = object_cache.get_or_404(User, username=username)
     user = request.user
     Follow.objects.filter(user=user, author=author).delete()
     return redirect('posts:follow_index')
+
+
+def profile_followers(request, username):
+    return _follow_list(request, username, followers_page, 'Подписчики')
+
+
+def profile_following(request, username):
+    return _follow_list(request, username, following_page, 'Подписки')
+
+
+def profile_followers_json(request, username):
+    return _follow_list_json(request, username, followers_page)
+
+
+def profile_following_json(request, username):
+    return _follow_list_json(request, username, following_page)
+
+
+def _follow_list(request, username, get_page, title):
+    user = object_cache.get_or_404(User, username=username)
+    after = _cursor(request)
+    entries, next_cursor = get_page(
+        user, request.user, after, settings.FOLLOWS_PER_PAGE)
+    context = {
+        'author': user,
+        'title': title,
+        'entries': entries,
+        'next_cursor': next_cursor,
+        'is_first': after is None,
+    }
+    return render(request, 'posts/follow_list.html', context)
+
+
+def _follow_list_json(request, username, get_page):
+    user = object_cache.get_or_404(User, username=username)
+    entries, next_cursor = get_page(
+        user, request.user, _cursor(request), settings.FOLLOWS_PER_PAGE)
+    return JsonResponse({
+        'results': [
+            {
+                'id': entry.follow_id,
+                'username': entry.user.username,
+                'follows_you': entry.follows_you,
+            }
+            for entry in entries
+        ],
+        'next': next_cursor,
+    })
+
+
+def _cursor(request):
+    """Курсор ?after= или None; мусор считается первой страницей."""
+    try:
+        return int(request.GET['after'])
+    except (KeyError, ValueError):
+        return None
+
+
+@login_required
+def notifications(request):
+    notification_list = (request.user.notifications.
+                         select_related('post', 'last_actor'))
+    paginator = EstimatedPaginator(
+        notification_list, settings.NUM_OF_DISPLAYED_POSTS)
+    page_number = request.GET.get('page')
+    page_obj = paginator.get_page(page_number)
+    # Прочитанными становятся только уведомления этой страницы
+    page_obj.object_list = list(page_obj.object_list)
+    mark_read(request.user, [
+        notification.id for notification in page_obj.object_list
+        if not notification.is_read
+    ])
+    context = {
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/notifications.html', context)
+
+
+def _event_stream(channels, event, watermark, catch_up, excluded):
+    """Поток SSE: число новых записей по каналам брокера или пинг.
+
+    watermark - ключ последней записи, которую клиент уже видел: верх
+    отрендеренной страницы или Last-Event-ID после переподключения.
+    catch_up(watermark) находит в базе записи, появившиеся до подписки,
+    дальше их приносит брокер. Ключ последней учтённой записи уходит
+    клиенту в строке id:, и переподключение продолжает с него.
+    """
+    subscription = broker.subscribe(channels)
+    try:
+        items = catch_up(watermark)
+        yield f'retry: {settings.SSE_RETRY_MS}\n{_id_line(watermark)}\n'
+        deadline = time.monotonic() + settings.SSE_MAX_DURATION
+        waited = False
+        while True:
+            count = 0
+            for key, author_id in sorted(items):
+                if author_id in excluded:
+                    continue
+                if watermark is not None and key <= watermark:
+                    # Запись пришла и из базы, и от брокера или по двум
+                    # каналам сразу
+                    continue
+                count += 1
+                watermark = key
+            if count:
+                data = json.dumps({'count': count})
+                yield f'event: {event}\n{_id_line(watermark)}data: {data}\n\n'
+            elif waited:
+                yield ': ping\n\n'
+            if time.monotonic() >= deadline:
+                break
+            items = subscription.wait(settings.SSE_HEARTBEAT)
+            waited = True
+    finally:
+        subscription.close()
+
+
+def _id_line(key):
+    if key is None:
+        return ''
+    if isinstance(key, tuple):
+        pub_date, post_id = key
+        return f'id: {pub_date.isoformat()},{post_id}\n'
+    return f'id: {key}\n'
+
+
+def _event_response(*args):
+    response = StreamingHttpResponse(
+        _event_stream(*args), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Не даём nginx буферизовать поток
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _post_events(request, posts, channels):
+    """Поток о новых постах выборки posts, приходящих по channels."""
+    posts = exclude_authors(posts, request.user)
+    newest = posts.order_by('-pub_date', '-id').values_list(
+        'pub_date', 'id', 'author_id')
+    raw = request.META.get('HTTP_LAST_EVENT_ID')
+    if raw:
+        raw_date, _, raw_id = raw.rpartition(',')
+    else:
+        raw_date, raw_id = request.GET.get('pub_date'), request.GET.get('id')
+    watermark = _parse_watermark(raw_date, raw_id)
+    if watermark is None:
+        latest = newest.first()
+        watermark = latest[:2] if latest else None
+
+    def catch_up(watermark):
+        rows = newest
+        if watermark is not None:
+            pub_date, last_id = watermark
+            rows = _newer_than(newest, last_id, pub_date)
+        return [
+            ((pub_date, post_id), author_id)
+            for pub_date, post_id, author_id
+            in rows[:settings.POSTS_SINCE_MAX_IDS]
+        ]
+    return _event_response(
+        channels, 'new_posts', watermark, catch_up,
+        set(excluded_authors(request.user)))
+
+
+def index_events(request):
+    return _post_events(request, Post.objects.visible(), [index_channel()])
+
+
+@login_required
+def follow_events(request):
+    by_authors, by_groups = _followed_posts(request.user)
+    author_ids = Follow.objects.filter(
+        user=request.user).values_list('author_id', flat=True)
+    group_ids = GroupFollow.objects.filter(
+        user=request.user).values_list('group_id', flat=True)
+    channels = [author_channel(author_id) for author_id in author_ids]
+    channels += [group_channel(group_id) for group_id in group_ids]
+    return _post_events(request, by_authors | by_groups, channels)
+
+
+def comment_events(request, post_id):
+    comments = exclude_authors(
+        Comment.objects.filter(post_id=post_id), request.user)
+    raw_id = (request.META.get('HTTP_LAST_EVENT_ID')
+              or request.GET.get('id'))
+    try:
+        watermark = int(raw_id)
+    except (TypeError, ValueError):
+        watermark = comments.aggregate(last_id=Max('id'))['last_id']
+
+    def catch_up(watermark):
+        rows = comments.filter(id__gt=watermark or 0).order_by('id')
+        return list(rows.values_list(
+            'id', 'author_id')[:settings.POSTS_SINCE_MAX_IDS])
+    return _event_response(
+        [comments_channel(post_id)], 'new_comments', watermark, catch_up,
+        set(excluded_authors(request.user)))
+
+
+def _posts_since(request, posts):
+    """Число и id постов новее водяного знака (pub_date, id).
+
+    Ответ строится по индексу (pub_date, id) без рендеринга шаблонов.
+    Без водяного знака возвращается текущий - с него клиент начинает.
+    """
+    raw_date = request.GET.get('pub_date')
+    raw_id = request.GET.get('id')
+    newest = posts.order_by('-pub_date', '-id').values_list('id', 'pub_date')
+    if raw_date is None and raw_id is None:
+        latest = newest.first()
+        return JsonResponse({
+            'count': 0,
+            'ids': [],
+            'watermark': _watermark(latest),
+        })
+    watermark = _parse_watermark(raw_date, raw_id)
+    if watermark is None:
+        return JsonResponse(
+            {'error': 'Ожидаются параметры pub_date (ISO 8601) и id'},
+            status=400)
+    pub_date, last_id = watermark
+    newer = _newer_than(newest, last_id, pub_date)
+    rows = list(newer[:settings.POSTS_SINCE_MAX_IDS])
+    count = len(rows)
+    if count == settings.POSTS_SINCE_MAX_IDS:
+        count = newer.count()
+    return JsonResponse({
+        'count': count,
+        'ids': [post_id for post_id, _ in rows],
+        'watermark': _watermark(rows[0] if rows else (last_id, pub_date)),
+    })
+
+
+def _parse_watermark(raw_date, raw_id):
+    """Водяной знак (pub_date, id) из строк или None, если он не разобран."""
+    try:
+        pub_date = parse_datetime(raw_date or '')
+        last_id = int(raw_id)
+    except (TypeError, ValueError):
+        return None
+    if pub_date is None:
+        return None
+    if timezone.is_naive(pub_date):
+        pub_date = timezone.make_aware(pub_date, timezone.utc)
+    return pub_date, last_id
+
+
+def _newer_than(posts, last_id, pub_date):
+    """Посты позже водяного знака в порядке (pub_date, id)."""
+    return posts.filter(
+        Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=last_id))
+
+
+def _watermark(row):
+    if row is None:
+        return None
+    post_id, pub_date = row
+    return {'pub_date': pub_date.isoformat(), 'id': post_id}
+
+
+def index_since(request):
+    return _posts_since(
+        request, exclude_authors(Post.objects.visible(), request.user))
+
+
+def group_posts_since(request, slug):
+    group = groups.get_by_slug(slug)
+    if group is None:
+        raise Http404('Группа не найдена')
+    return _posts_since(request, exclude_authors(
+        Post.objects.visible().filter(group=group), request.user))
+
+
+def profile_since(request, username):
+    author = object_cache.get_or_404(User, username=username)
+    return _posts_since(request, exclude_authors(
+        Post.objects.visible().filter(author=author), request.user))
+
+
+@login_required
+def follow_index_since(request):
+    by_authors, by_groups = _followed_posts(request.user)
+    return _posts_since(
+        request, exclude_authors(by_authors | by_groups, request.user))
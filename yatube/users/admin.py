@@ -1,3 +1,34 @@
-# from django.contrib import admin
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
-# Register your models here.
+from posts.admin import deletion_perms_needed
+from posts.deletion import schedule_user_deletion, user_dependents
+from posts.models import DeletionTask
+
+User = get_user_model()
+
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class UserAdmin(BaseUserAdmin):
+    # Пользователь с тысячами постов удаляется в фоне командой
+    # process_deletions, здесь он только деактивируется
+    def get_deleted_objects(self, objs, request):
+        perms_needed = deletion_perms_needed(
+            request, self.admin_site,
+            user_dependents([obj.pk for obj in objs]))
+        return [str(obj) for obj in objs], {}, perms_needed, []
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, User.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        # Повторное удаление не ставит вторую задачу в очередь
+        pending = set(DeletionTask.objects.filter(
+            user__in=queryset, status=DeletionTask.PENDING,
+        ).values_list('user_id', flat=True))
+        for user in queryset:
+            if user.pk not in pending:
+                schedule_user_deletion(user)
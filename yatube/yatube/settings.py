@@ -85,6 +85,7 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 # Добавлен контекст-процессор
                 'core.context_processors.year.year',
+                'core.context_processors.notifications.unread',
             ],
         },
     },
@@ -155,3 +156,97 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
 NUM_OF_DISPLAYED_POSTS = 10
+# Сколько страниц можно пролистать в ленте подписок
+FOLLOW_FEED_MAX_PAGES = 50
+
+# Выборки до EXACT_COUNT_THRESHOLD строк пагинатор считает точно,
+# для больших показывает оценку, обновляемую раз в
+# ESTIMATED_COUNT_TIMEOUT секунд
+EXACT_COUNT_THRESHOLD = 1000
+ESTIMATED_COUNT_TIMEOUT = 60
+PAGINATOR_PAGES_ON_EACH_SIDE = 3
+
+# Счётчик просмотров постов: приращения копятся в памяти воркера
+# и сбрасываются в базу раз в POST_VIEWS_FLUSH_INTERVAL секунд
+# или каждые POST_VIEWS_FLUSH_THRESHOLD просмотров
+POST_VIEWS_ENABLED = True
+POST_VIEWS_FLUSH_INTERVAL = 5
+POST_VIEWS_FLUSH_THRESHOLD = 100
+
+# Число шардов счётчика лайков одного поста
+LIKE_COUNTER_SHARDS = 8
+
+# Сколько секунд процесс помнит счётчик непрочитанных уведомлений
+# и до какого числа их считать (дальше значок показывает «99+»)
+NOTIFICATIONS_UNREAD_TIMEOUT = 15
+NOTIFICATIONS_UNREAD_LIMIT = 99
+
+# Server-Sent Events: период опроса базы, пинга и время жизни
+# соединения в секундах, пауза перед переподключением клиента
+# в миллисекундах
+SSE_POLL_INTERVAL = 5
+SSE_HEARTBEAT = 15
+SSE_MAX_DURATION = 5 * 60
+SSE_RETRY_MS = 5000
+
+# Сколько id новых постов максимум отдаёт опрос «что нового»
+POSTS_SINCE_MAX_IDS = 100
+
+# Размер порции для массовых операций в админке и фоновом удалении
+ADMIN_BATCH_SIZE = 1000
+
+# Посты старше этого числа дней переносит в архив команда archive_posts
+ARCHIVE_AFTER_DAYS = 365
+
+# Время жизни объектов Post, Group и User в кэше объектов, в секундах
+OBJECT_CACHE_TIMEOUT = 5 * 60
+# Как часто процесс читает журнал ключей, сброшенных другими процессами
+OBJECT_CACHE_CHECK_INTERVAL = 5
+# Как часто процесс сверяет реестр групп с базой, в секундах
+GROUPS_CHECK_INTERVAL = 10
+
+# Сколько секунд лента отдаёт закэшированные id постов страницы
+FEED_CACHE_TIMEOUT = 20
+
+# Сколько секунд помнится, что объекта с таким id или slug нет,
+# и сколько живёт заранее отрендеренная страница 404
+NEGATIVE_CACHE_TIMEOUT = 30
+NOT_FOUND_PAGE_TIMEOUT = 60 * 60
+
+# Сколько символов текста поста показывают ленты до «Читать дальше»
+POST_EXCERPT_LENGTH = 500
+
+# Сколько пользователей на странице подписчиков и подписок
+FOLLOWS_PER_PAGE = 20
+
+# Скрытых авторов не больше этого числа исключаем списком id в запросе,
+# больше - подзапросом NOT EXISTS; сам список кэшируется на
+# BLOCKS_CACHE_TIMEOUT секунд под ключом с версией из базы
+BLOCKS_INLINE_LIMIT = 100
+BLOCKS_CACHE_TIMEOUT = 10 * 60
+
+# Сколько секунд загрузка удерживает файл картинки от удаления, пока
+# её пост не сохранён
+MEDIA_PIN_TIMEOUT = 10 * 60
+
+# Загружаемые картинки постов: предельный размер файла в байтах и число
+# пикселей, длинная сторона после уменьшения и качество JPEG
+IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+IMAGE_MAX_PIXELS = 50 * 1000 * 1000
+IMAGE_MAX_SIDE = 1920
+IMAGE_JPEG_QUALITY = 85
+
+# Загрузки пишутся сразу во временный файл на диске, а не в память,
+# и обрываются, как только превысят IMAGE_MAX_UPLOAD_SIZE
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.LimitedTemporaryFileUploadHandler',
+]
+
+# Адаптивные миниатюры картинок постов: ширины, пропорции кадра,
+# качество и форматы помимо JPEG (берутся, если их умеет Pillow)
+IMAGE_VARIANT_WIDTHS = (320, 640, 960)
+IMAGE_VARIANT_RATIO = (960, 339)
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_FORMATS = ('WEBP',)
+# Сколько секунд хранятся готовые адреса миниатюр картинки
+PICTURE_CACHE_TIMEOUT = 10 * 60